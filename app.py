@@ -1,7 +1,17 @@
+import functools
 import streamlit as st
-from openai import OpenAI
-import json
-import re
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import time
+import config
+import games
+from generation import FallbackBatch, GenerationError, generate_items, generate_many
+from item_store import session_registry, shared_batches
+from json_stream import StreamedItems
+from metrics import metrics, profile_rerun, render_metrics, start_metrics_server
+from prefetch import start_prefetch
+from seen_set import SeenSet
+from state_store import load_game, new_game_token, save_game
+from youtube_player import youtube_player
 
 
 # Configure OpenAI - only from Streamlit secrets
@@ -9,18 +19,8 @@ def get_openai_api_key():
     return st.secrets.get("OPENAI_API_KEY")
 
 
-
-
-# Page configuration
-st.set_page_config(
-    page_title="Multi-Game Entertainment Hub",
-    page_icon="🎮",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Custom CSS for better styling
-st.markdown("""
+# Static markup, built once per process rather than on every rerun
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -73,7 +73,181 @@ st.markdown("""
         background: linear-gradient(180deg, #f8f9fa 0%, #e9ecef 100%);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+HOW_TO_PLAY = {
+    "songs": """---
+### How to Play:
+1. Enter a theme or prompt
+2. Click 'Generate Videos' to get 25 song links
+3. Listen to the song and guess the title/artist
+4. Click 'Reveal' to see the answer
+5. Use Previous/Next to navigate
+""",
+    "quotes": """---
+### How to Play:
+1. Enter a theme or prompt
+2. Click 'Generate Quotes' to get 25 movie quotes
+3. Read the quote and guess the movie/character
+4. Click 'Reveal' to see the answer
+5. Use Previous/Next to navigate
+""",
+    "movies": """---
+### How to Play:
+1. Enter a theme or prompt
+2. Click 'Generate Movies' to get 25 movie suggestions
+3. Read the scene description and guess the movie
+4. Click 'Reveal' to see the answer
+5. Use Previous/Next to navigate
+""",
+}
+
+
+# Session state keys holding each game's batch and position
+BATCH_KEYS = {
+    "songs": ("videos", "current_video_index"),
+    "quotes": ("quotes", "current_quote_index"),
+    "movies": ("movies", "current_frame_index"),
+}
+
+
+# Identify this browser session for idle eviction and the memory report
+def get_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+# Hand a new batch to the session and register it for idle eviction
+def set_batch(spec, items, prompt):
+    items_key, index_key = BATCH_KEYS[spec.name]
+    st.session_state[items_key] = items
+    st.session_state[index_key] = 0
+    st.session_state.batch_prompts[spec.name] = prompt
+    session_registry.track(get_session_id(), spec.name, items)
+
+
+# Read a URL query parameter on both old and new Streamlit versions
+def get_query_param(name):
+    params = getattr(st, "query_params", None)
+    if params is not None:
+        return params.get(name)
+    values = st.experimental_get_query_params().get(name)
+    return values[0] if values else None
+
+
+# Set a URL query parameter, keeping the others
+def set_query_param(name, value):
+    params = getattr(st, "query_params", None)
+    if params is not None:
+        params[name] = value
+        return
+    params = st.experimental_get_query_params()
+    params[name] = value
+    st.experimental_set_query_params(**params)
+
+
+# Everything needed to resume this session's games in another process
+def game_state():
+    return {
+        "games": {
+            name: {
+                "items": list(st.session_state[items_key]),
+                "index": st.session_state[index_key],
+                "prompt": st.session_state.batch_prompts.get(name),
+            }
+            for name, (items_key, index_key) in BATCH_KEYS.items()
+        },
+        "hint_level": st.session_state.hint_level,
+        "seen": {name: seen.to_state() for name, seen in st.session_state.seen_sets.items()},
+    }
+
+
+# Save the game under its token (?game=...) whenever it changed since the last save
+def persist_game():
+    batches = [st.session_state[items_key] for items_key, _ in BATCH_KEYS.values()]
+    if not any(batches):
+        return
+    signature = (
+        tuple(len(items) for items in batches),
+        tuple(st.session_state[index_key] for _, index_key in BATCH_KEYS.values()),
+        st.session_state.hint_level,
+    )
+    if st.session_state.game_token is None:
+        st.session_state.game_token = new_game_token()
+        set_query_param("game", st.session_state.game_token)
+    elif signature == st.session_state.saved_signature:
+        return
+    save_game(st.session_state.game_token, game_state())
+    st.session_state.saved_signature = signature
+
+
+# Load a saved game into this session; returns False if there is none
+def restore_game(token):
+    state = load_game(token)
+    if state is None:
+        return False
+    for name, saved in state.get("games", {}).items():
+        if name not in BATCH_KEYS:
+            continue
+        spec = games.GAMES[name]
+        items = [spec.load_item(item) for item in saved.get("items", [])]
+        items_key, index_key = BATCH_KEYS[name]
+        st.session_state[items_key] = items
+        st.session_state[index_key] = min(saved.get("index", 0), max(len(items) - 1, 0))
+        if saved.get("prompt"):
+            st.session_state.batch_prompts[name] = saved["prompt"]
+        session_registry.track(get_session_id(), name, items)
+    st.session_state.hint_level = state.get("hint_level", 0)
+    for name, seen in state.get("seen", {}).items():
+        if name in st.session_state.seen_sets:
+            st.session_state.seen_sets[name].restore(seen)
+    return True
+
+
+# The admin tab is only shown at ?admin=<ADMIN_TOKEN>
+def is_admin():
+    return bool(config.ADMIN_TOKEN) and get_query_param("admin") == config.ADMIN_TOKEN
+
+
+# Operational view: metrics, per-session memory and a profiling hint
+def render_admin_tab():
+    st.markdown('<h2 class="sub-header">🛠️ Admin</h2>', unsafe_allow_html=True)
+    st.subheader("Sessions")
+    st.table(session_registry.memory_report())
+    st.subheader("Metrics")
+    st.code(render_metrics(), language="text")
+    st.caption("Set PROFILE_RERUN=1 to write a cProfile of the first rerun to PROFILE_DIR.")
+
+
+# Describe a freshly generated batch, which may still be streaming in
+def describe_batch(items, noun):
+    if isinstance(items, FallbackBatch):
+        return f"ChatGPT is busy right now - here are {len(items)} {noun}s from earlier games instead!"
+    if isinstance(items, StreamedItems) and not items.finished.is_set():
+        return f"First {noun} ready - the rest are loading in the background!"
+    return f"Generated {len(items)} {noun}s!"
+
+
+# Caption for the navigation progress of a batch
+def batch_caption(label, index, items):
+    caption = f"{label} {index + 1} of {len(items)}"
+    if isinstance(items, StreamedItems) and not items.finished.is_set():
+        caption += " (loading more...)"
+    return caption
+
+
+
+
+# Page configuration
+st.set_page_config(
+    page_title="Multi-Game Entertainment Hub",
+    page_icon="🎮",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Custom CSS for better styling
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Initialize session state
 if 'current_video_index' not in st.session_state:
@@ -90,274 +264,329 @@ if 'movies' not in st.session_state:
     st.session_state.movies = []
 if 'hint_level' not in st.session_state:
     st.session_state.hint_level = 0
-
-
-# Extract YouTube video IDs from text
-def extract_youtube_links(text):
-    """Extract YouTube video IDs from text using regex"""
-    # Pattern to match YouTube URLs
-    patterns = [
-        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]+)',
-        r'(?:https?://)?(?:www\.)?youtu\.be/([a-zA-Z0-9_-]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]+)'
-    ]
-    
-    video_ids = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        video_ids.extend(matches)
-    
-    return list(set(video_ids))  # Remove duplicates
-
-# Get YouTube videos with ChatGPT
-def get_youtube_videos_with_chatgpt(prompt, exclude_songs=None):
-    """Use ChatGPT to get song suggestions, then search YouTube for those songs"""
+if 'batch_prompts' not in st.session_state:
+    st.session_state.batch_prompts = {}
+if 'prefetch_jobs' not in st.session_state:
+    st.session_state.prefetch_jobs = {}
+if 'seen_sets' not in st.session_state:
+    st.session_state.seen_sets = {spec.name: SeenSet(spec) for spec in games.GAMES.values()}
+if 'saved_signature' not in st.session_state:
+    st.session_state.saved_signature = None
+if 'game_token' not in st.session_state:
+    # A ?game=<token> link resumes a saved game, even one started on another replica
+    token = get_query_param("game")
+    st.session_state.game_token = token if token and restore_game(token) else None
+
+# Prometheus text on localhost, for scraping alongside the app
+if config.METRICS_PORT:
+    start_metrics_server(config.METRICS_PORT)
+
+# Batches of sessions left idle are evicted to keep server memory flat; an
+# evicted session gets its saved game back if there is one
+def keep_session_alive():
+    return not session_registry.touch(get_session_id()) or restore_game(st.session_state.game_token)
+
+if not keep_session_alive():
+    st.info("⏳ Your previous batches were cleared after a period of inactivity. Generate again to keep playing!")
+
+
+# Run a game's generator, reporting failures in the UI
+def run_generator(spec, prompt, exclude, stream, label):
     try:
-        # First, use ChatGPT to suggest songs based on the prompt
-        system_prompt = """You are a helpful assistant that suggests songs based on user prompts.
-        For each suggestion, provide:
-        1. The song title
-        2. The movie/show/game it's from (if applicable)
-        3. The artist/band name
-        4. link to youtube - KARAOKE VERSION
-
-        Return the information in this exact JSON format:
-        [
-            {
-                "title": "Song Title",
-                "source": "Movie/Show/Game Name",
-                "artist": "Artist/Band Name",
-                "link": "url link"
-            }
-        ]
-
-        Return exactly 25 songs. Make sure the JSON is valid and return only the json."""
-
-        # Compose user prompt
-        if exclude_songs and isinstance(exclude_songs, list) and len(exclude_songs) > 0 and isinstance(exclude_songs[0], dict):
-            exclude_list = [f"{song['title']} by {song['artist']}" for song in exclude_songs]
-            user_prompt = f"Suggest 25 songs related to: {prompt}. Please avoid these songs: {', '.join(exclude_list)}"
-        else:
-            user_prompt = f"Suggest 25 songs related to: {prompt}"
-
-        # Get API key
-        api_key = get_openai_api_key()
-        if not api_key:
-            st.error("OpenAI API key not found in Streamlit secrets!")
-            return []
-
-        # Create OpenAI client
-        client = OpenAI(api_key=api_key)
-
-        # Make API call
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=3000,
-            temperature=0.7
+        return generate_items(
+            spec,
+            prompt,
+            exclude,
+            get_api_key=get_openai_api_key,
+            stream=stream,
+            seen=st.session_state.seen_sets[spec.name],
+            allow_fallback=True  # A player pressed Generate: cached content beats an error
         )
-
-        # Extract response content
-        response_content = response.choices[0].message.content.strip()
-
-        # Try to extract JSON from response
-        try:
-            # Look for JSON in the response
-            json_start = response_content.find('[')
-            json_end = response_content.rfind(']') + 1
-            
-            if json_start != -1 and json_end != 0:
-                json_str = response_content[json_start:json_end]
-                songs_data = json.loads(json_str)
-            else:
-                st.error("No valid JSON found in ChatGPT response")
-                return []
-        except json.JSONDecodeError as e:
-            st.error(f"Failed to parse JSON from ChatGPT response: {e}")
-            return []
-
-        # Extract video IDs from links
-        video_ids = []
-        for song in songs_data:
-            if 'link' in song and song['link']:
-                ids = extract_youtube_links(song['link'])
-                if ids:
-                    video_ids.extend(ids)
-                    song['video_id'] = ids[0]  # Store the video ID
-
-        return video_ids[:25]  # Return max 25 videos
-
+    except GenerationError as e:
+        st.error(str(e))
+        return []
     except Exception as e:
-        st.error(f"Error getting videos: {str(e)}")
+        st.error(f"Error getting {label}: {str(e)}")
         return []
 
+# Get YouTube videos with ChatGPT
+def get_youtube_videos_with_chatgpt(prompt, exclude_songs=None, stream=False):
+    """Use ChatGPT to get song suggestions, then search YouTube for those songs"""
+    return run_generator(games.SONGS, prompt, exclude_songs, stream, "videos")
+
 # Get movie quotes with ChatGPT
-def get_movie_quotes_with_chatgpt(prompt, exclude_quotes=None):
+def get_movie_quotes_with_chatgpt(prompt, exclude_quotes=None, stream=False):
     """Use ChatGPT to get movie quote suggestions"""
-    try:
-        # System prompt for movie quotes
-        system_prompt = """You are a helpful assistant that suggests famous movie quotes based on user prompts.
-        For each suggestion, provide:
-        1. The quote text
-        2. The movie/show it's from
-        3. The character who said it (if known)
-        4. The year of the movie/show (if known)
-
-        Return the information in this exact JSON format:
-        [
-            {
-                "quote": "The actual quote text here",
-                "movie": "Movie/Show Name",
-                "character": "Character Name",
-                "year": "Year"
-            }
-        ]
-        
-        Return exactly 25 quotes. Make sure the JSON is valid and return only the json."""
-
-        # Compose user prompt
-        if exclude_quotes and isinstance(exclude_quotes, list) and len(exclude_quotes) > 0 and isinstance(exclude_quotes[0], dict):
-            exclude_list = [f"{quote['quote'][:50]}..." for quote in exclude_quotes]
-            user_prompt = f"Suggest 25 famous movie quotes related to: {prompt}. Please avoid these quotes: {', '.join(exclude_list)}"
-        else:
-            user_prompt = f"Suggest 25 famous movie quotes related to: {prompt}"
-
-        # Get API key
-        api_key = get_openai_api_key()
-        if not api_key:
-            st.error("OpenAI API key not found in Streamlit secrets!")
-            return []
-
-        # Create OpenAI client
-        client = OpenAI(api_key=api_key)
-
-        # Make API call
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=3000,
-            temperature=0.7
-        )
-
-        # Extract response content
-        response_content = response.choices[0].message.content.strip()
-
-        # Try to extract JSON from response
-        try:
-            # Look for JSON in the response
-            json_start = response_content.find('[')
-            json_end = response_content.rfind(']') + 1
-            
-            if json_start != -1 and json_end != 0:
-                json_str = response_content[json_start:json_end]
-                quotes_data = json.loads(json_str)
-            else:
-                st.error("No valid JSON found in ChatGPT response")
-                return []
-        except json.JSONDecodeError as e:
-            st.error(f"Failed to parse JSON from ChatGPT response: {e}")
-            return []
-
-        return quotes_data[:25]  # Return max 25 quotes
-
-    except Exception as e:
-        st.error(f"Error getting quotes: {str(e)}")
-        return []
+    return run_generator(games.QUOTES, prompt, exclude_quotes, stream, "quotes")
 
 # Get movie frames with ChatGPT
-def get_movie_frames_with_chatgpt(prompt, exclude_movies=None):
+def get_movie_frames_with_chatgpt(prompt, exclude_movies=None, stream=False):
     """Use ChatGPT to get movie suggestions for frame guessing"""
-    try:
-        # System prompt for movie frames
-        system_prompt = """You are a helpful assistant that suggests famous movies based on user prompts.
-        For each suggestion, provide:
-        1. The movie title
-        2. The year of the movie
-        3. A brief description of a memorable scene or frame (with character names)
-        4. The genre of the movie
-        5. An anonymized version of the scene description (replace character names with "Person A", "Person B", etc.)
-
-        Return the information in this exact JSON format:
-        [
-            {
-                "title": "Movie Title",
-                "year": "Year",
-                "description": "Brief description of a memorable scene with character names",
-                "anonymized_description": "Same scene but with Person A, Person B, etc. instead of names",
-                "genre": "Genre"
-            }
-        ]
-        
-        Return exactly 25 movies. Make sure the JSON is valid and return only the json."""
-
-        # Compose user prompt
-        if exclude_movies and isinstance(exclude_movies, list) and len(exclude_movies) > 0 and isinstance(exclude_movies[0], dict):
-            exclude_list = [f"{movie['title']} ({movie['year']})" for movie in exclude_movies]
-            user_prompt = f"Suggest 25 famous movies related to: {prompt}. Please avoid these movies: {', '.join(exclude_list)}"
+    return run_generator(games.MOVIES, prompt, exclude_movies, stream, "movies")
+
+# Prefetch the next batch once the player nears the end of the current one
+def prefetch_next_batch(spec, items, index):
+    if isinstance(items, StreamedItems) and not items.finished.is_set():
+        return  # The current batch is still arriving
+    if len(items) - 1 - index > config.PREFETCH_THRESHOLD:
+        return
+
+    # Skip while a prefetch is running, if the last one found nothing new, or
+    # for a short cool-down after one failed
+    pending = st.session_state.prefetch_jobs.get(spec.name)
+    if pending is not None and pending["items"] is items:
+        future = pending["future"]
+        if not future.done():
+            return
+        error = future.exception()
+        if error is None:
+            if future.result() == 0:
+                return
         else:
-            user_prompt = f"Suggest 25 famous movies related to: {prompt}"
-
-        # Get API key
-        api_key = get_openai_api_key()
-        if not api_key:
-            st.error("OpenAI API key not found in Streamlit secrets!")
-            return []
-
-        # Create OpenAI client
-        client = OpenAI(api_key=api_key)
-
-        # Make API call
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=3000,
-            temperature=0.7
-        )
+            if pending["failed_at"] is None:
+                pending["failed_at"] = time.monotonic()
+                metrics.inc("ysg_prefetch_failures_total", game=spec.name)
+            if time.monotonic() - pending["failed_at"] < config.PREFETCH_RETRY_SECONDS:
+                if index >= len(items) - 1:
+                    st.warning(f"⚠️ Couldn't load more {spec.plural} ({error}). Trying again shortly...")
+                return
+
+    prompt = st.session_state.batch_prompts.get(spec.name)
+    if not prompt:
+        return
+
+    # Session state is read here; the worker thread runs without a script context
+    seen = st.session_state.seen_sets[spec.name]
+    future = start_prefetch(
+        items,
+        lambda: generate_items(spec, prompt, get_api_key=get_openai_api_key, seen=seen)
+    )
+    st.session_state.prefetch_jobs[spec.name] = {"future": future, "items": items, "failed_at": None}
+
+# Fill every game for one theme with concurrent requests
+def generate_all_games(prompt):
+    targets = [games.SONGS, games.QUOTES, games.MOVIES]
+    results = generate_many(
+        [(spec, prompt) for spec in targets],
+        get_api_key=get_openai_api_key,
+        seen_sets=st.session_state.seen_sets,
+        allow_fallback=True
+    )
+
+    for spec, result in zip(targets, results):
+        if isinstance(result, Exception):
+            st.error(f"Error getting {spec.plural}: {str(result)}")
+        elif not result:
+            st.error(f"No {spec.plural} found. Try a different prompt.")
+        else:
+            set_batch(spec, result, prompt)
+            st.success(describe_batch(result, spec.plural[:-1]))
+    st.session_state.hint_level = 0
 
-        # Extract response content
-        response_content = response.choices[0].message.content.strip()
-
-        # Try to extract JSON from response
-        try:
-            # Look for JSON in the response
-            json_start = response_content.find('[')
-            json_end = response_content.rfind(']') + 1
-            
-            if json_start != -1 and json_end != 0:
-                json_str = response_content[json_start:json_end]
-                movies_data = json.loads(json_str)
-            else:
-                st.error("No valid JSON found in ChatGPT response")
-                return []
-        except json.JSONDecodeError as e:
-            st.error(f"Failed to parse JSON from ChatGPT response: {e}")
-            return []
+# Newer Streamlit reruns only the fragment a button was clicked in; older
+# versions rerun the whole script, once per click thanks to the callbacks below
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+
+# Render a game's play area as a fragment, timed on every run (full or partial)
+def game_fragment(game):
+    def decorate(fn):
+        timed = metrics.timed("ysg_game_render_seconds", lambda: {"game": game})(fn)
+
+        @functools.wraps(fn)
+        def run():
+            # A fragment rerun skips the top of the script, so navigating must
+            # mark the session active here or it would be evicted as idle
+            keep_session_alive()
+            return timed()
+        return fragment(run)
+    return decorate
+
+
+# Button callbacks run before the rerun a click triggers, so no st.rerun() is needed
+def step_batch(game, delta):
+    items_key, index_key = BATCH_KEYS[game]
+    index = st.session_state[index_key] + delta
+    if 0 <= index < len(st.session_state[items_key]):
+        st.session_state[index_key] = index
+        if game == "movies":
+            st.session_state.hint_level = 0  # Reset hint level
+        persist_game()  # A fragment rerun doesn't reach the save at the end of main()
+
+
+def set_hint_level(level):
+    st.session_state.hint_level = level
+    persist_game()
+
+
+# Previous/Next/Reveal buttons and the progress of a game's batch
+def render_navigation(spec, label, key_suffix):
+    items_key, index_key = BATCH_KEYS[spec.name]
+    items = st.session_state[items_key]
+    index = st.session_state[index_key]
+
+    st.subheader("Navigation")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("⏮️ Previous", key=f"prev_{key_suffix}", on_click=step_batch, args=(spec.name, -1))
+    with col2:
+        st.button("⏭️ Next", key=f"next_{key_suffix}", on_click=step_batch, args=(spec.name, 1))
+    with col3:
+        st.button("🎯 Reveal", key=f"reveal_{key_suffix}")
+
+    # Progress indicator
+    st.progress(index / max(len(items) - 1, 1))
+    st.caption(batch_caption(label, index, items))
+
+    prefetch_next_batch(spec, items, index)
+
+
+@game_fragment("songs")
+def song_game():
+    if not st.session_state.videos:
+        st.info("👆 Enter a prompt and click 'Generate Videos' to start playing!")
+        return
+    render_navigation(games.SONGS, "Video", "song")
+
+    current_song = st.session_state.videos[st.session_state.current_video_index]
+
+    # Display video
+    st.subheader("🎵 Listen and Guess!")
+
+    # Warning about video availability
+    st.warning("⚠️ Note: Some videos may be unavailable due to regional restrictions or copyright issues.")
+
+    # Thumbnail until clicked, then one player that Next/Previous only re-point
+    next_index = st.session_state.current_video_index + 1
+    next_song = st.session_state.videos[next_index] if next_index < len(st.session_state.videos) else None
+    youtube_player(current_song.video_id, next_song.video_id if next_song else None, key="song_player")
+
+    # Reveal button functionality
+    if st.button("🎯 Reveal Answer", key="reveal_answer_song"):
+        st.markdown('<div class="answer-box">', unsafe_allow_html=True)
+        st.write("**Song Information:**")
+        st.write(f"Title: {current_song.title or 'Unknown'}")
+        st.write(f"Artist: {current_song.artist or 'Unknown'}")
+        if current_song.source:
+            st.write(f"From: {current_song.source}")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+@game_fragment("quotes")
+def quote_game():
+    if not st.session_state.quotes:
+        st.info("👆 Enter a prompt in the sidebar and click 'Generate Quotes' to start playing!")
+        return
+    render_navigation(games.QUOTES, "Quote", "quote")
+
+    current_quote = st.session_state.quotes[st.session_state.current_quote_index]
+
+    # Display quote
+    st.subheader("🎬 Read and Guess!")
+    st.markdown('<div class="quote-box">', unsafe_allow_html=True)
+    st.write(f'"{current_quote.quote}"')
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Reveal button functionality
+    if st.button("🎯 Reveal Answer", key="reveal_answer_quote"):
+        st.markdown('<div class="answer-box">', unsafe_allow_html=True)
+        st.write("**Movie Information:**")
+        st.write(f"Movie: {current_quote.movie or 'Unknown'}")
+        st.write(f"Character: {current_quote.character or 'Unknown'}")
+        st.write(f"Year: {current_quote.year or 'Unknown'}")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+@game_fragment("movies")
+def movie_game():
+    if not st.session_state.movies:
+        st.info("👆 Enter a prompt and click 'Generate Movies' to start playing!")
+        return
+    render_navigation(games.MOVIES, "Movie", "frame")
+
+    current_movie = st.session_state.movies[st.session_state.current_frame_index]
+
+    # Display movie frame placeholder
+    st.subheader("🎭 Look and Guess!")
+
+    # Show scene description based on hint level
+    st.markdown('<div class="quote-box">', unsafe_allow_html=True)
+    st.write(f"**Scene Description:**")
+
+    if st.session_state.hint_level == 0:
+        # Level 0: Anonymized description (Person A, Person B, etc.)
+        description = current_movie.anonymized_description or current_movie.description or 'No description available'
+        st.write(f'"{description}"')
+    else:
+        # Level 1+: Full description with character names
+        description = current_movie.description or 'No description available'
+        st.write(f'"{description}"')
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Hint buttons with different levels
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.button("💡 Hint 1: Show Names", key="hint1_frame", on_click=set_hint_level, args=(1,))
+
+    with col2:
+        st.button("💡 Hint 2: Year & Genre", key="hint2_frame", on_click=set_hint_level, args=(2,))
+
+    with col3:
+        if st.button("🎯 Reveal Answer", key="reveal_answer_frame"):
+            st.markdown('<div class="answer-box">', unsafe_allow_html=True)
+            st.write("**Movie Information:**")
+            st.write(f"Title: {current_movie.title or 'Unknown'}")
+            st.write(f"Year: {current_movie.year or 'Unknown'}")
+            st.write(f"Genre: {current_movie.genre or 'Unknown'}")
+            st.markdown('</div>', unsafe_allow_html=True)
 
-        return movies_data[:25]  # Return max 25 movies
+    # Show hints based on level
+    if st.session_state.hint_level >= 1:
+        st.info(f"💡 **Hint 1:** Character names are now shown in the description above!")
+
+    if st.session_state.hint_level >= 2:
+        st.info(f"💡 **Hint 2:** This is a {current_movie.genre or 'Unknown'} movie from {current_movie.year or 'Unknown'}")
 
-    except Exception as e:
-        st.error(f"Error getting movies: {str(e)}")
-        return []
 
 # Main app
 def main():
     # Header
     st.markdown('<h1 class="main-header">🎮 Multi-Game Entertainment Hub</h1>', unsafe_allow_html=True)
+
+    # Memory held by this session's batches and by the batches every session shares
+    with st.sidebar.expander("🧠 Session memory"):
+        own_bytes, shared_bytes = session_registry.session_bytes(get_session_id())
+        shared = shared_batches.stats()
+        st.write(f"This session: {own_bytes / 1024:.1f} KB of its own, {shared_bytes / 1024:.1f} KB shared")
+        st.write(f"Shared batches: {shared['batches']} ({shared['bytes'] / 1024:.1f} KB)")
+        st.caption(f"{len(session_registry)} active sessions")
+    
+    # One theme for every game, generated in one go
+    with st.expander("🎲 Play all games with one theme"):
+        all_prompt = st.text_input(
+            "Enter a theme for all games:",
+            placeholder="e.g., 'Disney', '80s', 'sci-fi'",
+            key="all_games_prompt"
+        )
+        if st.button("Generate All Games", key="generate_all"):
+            if all_prompt:
+                with st.spinner("Generating songs, quotes and movies..."):
+                    generate_all_games(all_prompt)
+            else:
+                st.warning("Please enter a prompt first.")
     
     # Create tabs
-    tab1, tab2, tab3 = st.tabs(["🎵 Song Guessing Game", "🎬 Movie Quotes Game", "🎭 Movie Frame Game"])
+    tab_names = ["🎵 Song Guessing Game", "🎬 Movie Quotes Game", "🎭 Movie Frame Game"]
+    admin = is_admin()
+    if admin:
+        tab_names.append("🛠️ Admin")
+    tabs = st.tabs(tab_names)
+    tab1, tab2, tab3 = tabs[:3]
     
         # Song Guessing Game Tab
-    with tab1:
+    with tab1, metrics.timer("ysg_tab_render_seconds", tab="songs"):
         st.markdown('<h2 class="sub-header">🎵 Song Guessing Game</h2>', unsafe_allow_html=True)
         
         # Prompt input
@@ -371,89 +600,22 @@ def main():
         if st.button("Generate Videos", key="generate_songs"):
             if prompt:
                 with st.spinner("Generating song suggestions..."):
-                    videos = get_youtube_videos_with_chatgpt(prompt, None)
+                    videos = get_youtube_videos_with_chatgpt(prompt, None, stream=config.STREAM_RESPONSES)
                     if videos:
-                        st.session_state.videos = videos
-                        st.session_state.current_video_index = 0
-                        st.success(f"Generated {len(videos)} song videos!")
+                        set_batch(games.SONGS, videos, prompt)
+                        st.success(describe_batch(videos, "song video"))
                     else:
                         st.error("No videos found. Try a different prompt.")
             else:
                 st.warning("Please enter a prompt first.")
         
-        # Navigation controls
-        if st.session_state.videos:
-            st.subheader("Navigation")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("⏮️ Previous", key="prev_song"):
-                    if st.session_state.current_video_index > 0:
-                        st.session_state.current_video_index -= 1
-                        st.rerun()
-            
-            with col2:
-                if st.button("⏭️ Next", key="next_song"):
-                    if st.session_state.current_video_index < len(st.session_state.videos) - 1:
-                        st.session_state.current_video_index += 1
-                        st.rerun()
-            
-            with col3:
-                if st.button("🎯 Reveal", key="reveal_song"):
-                    st.rerun()
-            
-            # Progress indicator
-            st.progress(st.session_state.current_video_index / (len(st.session_state.videos) - 1))
-            st.caption(f"Video {st.session_state.current_video_index + 1} of {len(st.session_state.videos)}")
-        
-        # Instructions
-        st.markdown("---")
-        st.markdown("### How to Play:")
-        st.markdown("1. Enter a theme or prompt")
-        st.markdown("2. Click 'Generate Videos' to get 25 song links")
-        st.markdown("3. Listen to the song and guess the title/artist")
-        st.markdown("4. Click 'Reveal' to see the answer")
-        st.markdown("5. Use Previous/Next to navigate")
-            
+        # Navigation, video and answer rerun on their own
+        song_game()
 
-        
-        # Main content area for song game
-        if st.session_state.videos:
-            current_index = st.session_state.current_video_index
-            current_video_id = st.session_state.videos[current_index]
-            
-            # Display video
-            st.subheader("🎵 Listen and Guess!")
-            
-            # Warning about video availability
-            st.warning("⚠️ Note: Some videos may be unavailable due to regional restrictions or copyright issues.")
-            
-            # Auto-play video with JavaScript
-            st.markdown(f"""
-            <div style="margin: 20px 0;">
-                <iframe 
-                    width="100%" 
-                    height="400" 
-                    src="https://www.youtube.com/embed/{current_video_id}?autoplay=1&mute=0" 
-                    frameborder="0" 
-                    allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture" 
-                    allowfullscreen>
-                </iframe>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Reveal button functionality
-            if st.button("🎯 Reveal Answer", key="reveal_answer_song"):
-                st.markdown('<div class="answer-box">', unsafe_allow_html=True)
-                st.write("**Song Information:**")
-                st.write(f"Title: {current_video_id}")  # You might want to store more info
-                st.write("Artist: [To be implemented]")
-                st.markdown('</div>', unsafe_allow_html=True)
-        else:
-            st.info("👆 Enter a prompt and click 'Generate Videos' to start playing!")
+        st.markdown(HOW_TO_PLAY["songs"])
     
         # Movie Quotes Game Tab
-    with tab2:
+    with tab2, metrics.timer("ysg_tab_render_seconds", tab="quotes"):
         st.markdown('<h2 class="sub-header">🎬 Movie Quotes Game</h2>', unsafe_allow_html=True)
         
         # Prompt input for quotes
@@ -467,74 +629,23 @@ def main():
         if st.button("Generate Quotes", key="generate_quotes"):
             if quote_prompt:
                 with st.spinner("Generating movie quotes..."):
-                    quotes = get_movie_quotes_with_chatgpt(quote_prompt, None)
+                    quotes = get_movie_quotes_with_chatgpt(quote_prompt, None, stream=config.STREAM_RESPONSES)
                     if quotes:
-                        st.session_state.quotes = quotes
-                        st.session_state.current_quote_index = 0
-                        st.success(f"Generated {len(quotes)} movie quotes!")
+                        set_batch(games.QUOTES, quotes, quote_prompt)
+                        st.success(describe_batch(quotes, "movie quote"))
                     else:
                         st.error("No quotes found. Try a different prompt.")
             else:
                 st.warning("Please enter a prompt first.")
         
-        # Navigation controls for quotes
-        if st.session_state.quotes:
-            st.subheader("Navigation")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("⏮️ Previous", key="prev_quote"):
-                    if st.session_state.current_quote_index > 0:
-                        st.session_state.current_quote_index -= 1
-                        st.rerun()
-            
-            with col2:
-                if st.button("⏭️ Next", key="next_quote"):
-                    if st.session_state.current_quote_index < len(st.session_state.quotes) - 1:
-                        st.session_state.current_quote_index += 1
-                        st.rerun()
-            
-            with col3:
-                if st.button("🎯 Reveal", key="reveal_quote"):
-                    st.rerun()
-            
-            # Progress indicator
-            st.progress(st.session_state.current_quote_index / (len(st.session_state.quotes) - 1))
-            st.caption(f"Quote {st.session_state.current_quote_index + 1} of {len(st.session_state.quotes)}")
-        
-        # Main content area for movie quotes game
-        if st.session_state.quotes:
-            current_index = st.session_state.current_quote_index
-            current_quote = st.session_state.quotes[current_index]
-            
-            # Display quote
-            st.subheader("🎬 Read and Guess!")
-            st.markdown('<div class="quote-box">', unsafe_allow_html=True)
-            st.write(f'"{current_quote["quote"]}"')
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            # Reveal button functionality
-            if st.button("🎯 Reveal Answer", key="reveal_answer_quote"):
-                st.markdown('<div class="answer-box">', unsafe_allow_html=True)
-                st.write("**Movie Information:**")
-                st.write(f"Movie: {current_quote.get('movie', 'Unknown')}")
-                st.write(f"Character: {current_quote.get('character', 'Unknown')}")
-                st.write(f"Year: {current_quote.get('year', 'Unknown')}")
-                st.markdown('</div>', unsafe_allow_html=True)
-        else:
-            st.info("👆 Enter a prompt in the sidebar and click 'Generate Quotes' to start playing!")
+        # Navigation, quote and answer rerun on their own
+        quote_game()
         
         # Instructions for quotes
-        st.markdown("---")
-        st.markdown("### How to Play:")
-        st.markdown("1. Enter a theme or prompt")
-        st.markdown("2. Click 'Generate Quotes' to get 25 movie quotes")
-        st.markdown("3. Read the quote and guess the movie/character")
-        st.markdown("4. Click 'Reveal' to see the answer")
-        st.markdown("5. Use Previous/Next to navigate")
+        st.markdown(HOW_TO_PLAY["quotes"])
     
     # Movie Frame Game Tab
-    with tab3:
+    with tab3, metrics.timer("ysg_tab_render_seconds", tab="movies"):
         st.markdown('<h2 class="sub-header">🎭 Movie Frame Game</h2>', unsafe_allow_html=True)
         
         # Prompt input for movie frames
@@ -548,106 +659,29 @@ def main():
         if st.button("Generate Movies", key="generate_frames"):
             if frame_prompt:
                 with st.spinner("Generating movie suggestions..."):
-                    movies = get_movie_frames_with_chatgpt(frame_prompt, None)
+                    movies = get_movie_frames_with_chatgpt(frame_prompt, None, stream=config.STREAM_RESPONSES)
                     if movies:
-                        st.session_state.movies = movies
-                        st.session_state.current_frame_index = 0
+                        set_batch(games.MOVIES, movies, frame_prompt)
                         st.session_state.hint_level = 0  # Reset hint level
-                        st.success(f"Generated {len(movies)} movie suggestions!")
+                        st.success(describe_batch(movies, "movie suggestion"))
                     else:
                         st.error("No movies found. Try a different prompt.")
             else:
                 st.warning("Please enter a prompt first.")
         
-        # Navigation controls for movie frames
-        if st.session_state.movies:
-            st.subheader("Navigation")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("⏮️ Previous", key="prev_frame"):
-                    if st.session_state.current_frame_index > 0:
-                        st.session_state.current_frame_index -= 1
-                        st.session_state.hint_level = 0  # Reset hint level
-                        st.rerun()
-            
-            with col2:
-                if st.button("⏭️ Next", key="next_frame"):
-                    if st.session_state.current_frame_index < len(st.session_state.movies) - 1:
-                        st.session_state.current_frame_index += 1
-                        st.session_state.hint_level = 0  # Reset hint level
-                        st.rerun()
-            
-            with col3:
-                if st.button("🎯 Reveal", key="reveal_frame"):
-                    st.rerun()
-            
-            # Progress indicator
-            st.progress(st.session_state.current_frame_index / (len(st.session_state.movies) - 1))
-            st.caption(f"Movie {st.session_state.current_frame_index + 1} of {len(st.session_state.movies)}")
-        
-        # Main content area for movie frame game
-        if st.session_state.movies:
-            current_index = st.session_state.current_frame_index
-            current_movie = st.session_state.movies[current_index]
-            
-            # Display movie frame placeholder
-            st.subheader("🎭 Look and Guess!")
-            
-            # Show scene description based on hint level
-            st.markdown('<div class="quote-box">', unsafe_allow_html=True)
-            st.write(f"**Scene Description:**")
-            
-            if st.session_state.hint_level == 0:
-                # Level 0: Anonymized description (Person A, Person B, etc.)
-                description = current_movie.get('anonymized_description', current_movie.get('description', 'No description available'))
-                st.write(f'"{description}"')
-            else:
-                # Level 1+: Full description with character names
-                description = current_movie.get('description', 'No description available')
-                st.write(f'"{description}"')
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            # Hint buttons with different levels
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("💡 Hint 1: Show Names", key="hint1_frame"):
-                    st.session_state.hint_level = 1
-                    st.rerun()
-            
-            with col2:
-                if st.button("💡 Hint 2: Year & Genre", key="hint2_frame"):
-                    st.session_state.hint_level = 2
-                    st.rerun()
-            
-            with col3:
-                if st.button("🎯 Reveal Answer", key="reveal_answer_frame"):
-                    st.markdown('<div class="answer-box">', unsafe_allow_html=True)
-                    st.write("**Movie Information:**")
-                    st.write(f"Title: {current_movie.get('title', 'Unknown')}")
-                    st.write(f"Year: {current_movie.get('year', 'Unknown')}")
-                    st.write(f"Genre: {current_movie.get('genre', 'Unknown')}")
-                    st.markdown('</div>', unsafe_allow_html=True)
-            
-            # Show hints based on level
-            if st.session_state.hint_level >= 1:
-                st.info(f"💡 **Hint 1:** Character names are now shown in the description above!")
-            
-            if st.session_state.hint_level >= 2:
-                st.info(f"💡 **Hint 2:** This is a {current_movie.get('genre', 'Unknown')} movie from {current_movie.get('year', 'Unknown')}")
-        else:
-            st.info("👆 Enter a prompt and click 'Generate Movies' to start playing!")
+        # Navigation, scene, hints and answer rerun on their own
+        movie_game()
         
         # Instructions for movie frames
-        st.markdown("---")
-        st.markdown("### How to Play:")
-        st.markdown("1. Enter a theme or prompt")
-        st.markdown("2. Click 'Generate Movies' to get 25 movie suggestions")
-        st.markdown("3. Read the scene description and guess the movie")
-        st.markdown("4. Click 'Reveal' to see the answer")
-        st.markdown("5. Use Previous/Next to navigate")
+        st.markdown(HOW_TO_PLAY["movies"])
+
+    if admin:
+        with tabs[3]:
+            render_admin_tab()
+
+    # New batches and streamed items that arrived since the last save
+    persist_game()
 
 if __name__ == "__main__":
-    main() 
+    with profile_rerun(), metrics.timer("ysg_rerun_seconds"):
+        main() 
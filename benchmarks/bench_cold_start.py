@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for app.py.
+Each run starts a fresh interpreter, imports Streamlit (already loaded in a
+real server process, so it is reported separately) and renders the first page
+with Streamlit's AppTest, which is when a cold worker imports the app's
+modules. It reports first-render time, the rerun after it, the heavy modules
+the first page pulled in, and what the first Generate pays to set up the
+OpenAI client.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+
+HEAVY_MODULES = ("openai", "httpx", "requests", "pydantic")
+
+
+def cold_run():
+    """One cold start, run in a fresh interpreter; prints its timings as JSON"""
+    started = time.perf_counter()
+    import streamlit  # noqa: F401
+    streamlit_seconds = time.perf_counter() - started
+    from streamlit.testing.v1 import AppTest
+    loaded_before = set(sys.modules)
+
+    sys.path.insert(0, APP_DIR)
+    app = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=60)
+    started = time.perf_counter()
+    app.run()
+    first_render = time.perf_counter() - started
+    if app.exception:
+        raise SystemExit(f"App raised: {app.exception[0].message}")
+    heavy = sorted(name for name in HEAVY_MODULES if name in sys.modules and name not in loaded_before)
+
+    started = time.perf_counter()
+    app.run()
+    second_render = time.perf_counter() - started
+
+    from openai_pool import get_openai_client
+    started = time.perf_counter()
+    get_openai_client("sk-cold-start-benchmark")
+    client_setup = time.perf_counter() - started
+
+    print(json.dumps({
+        "streamlit": streamlit_seconds,
+        "first_render": first_render,
+        "second_render": second_render,
+        "client_setup": client_setup,
+        "heavy": heavy,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app.py cold-start and first-render time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        cold_run()
+        return
+
+    # Keep the runs away from the real cache and content packs
+    workdir = tempfile.mkdtemp(prefix="ysg-cold-")
+    env = dict(os.environ,
+               RESPONSE_CACHE_PATH=os.path.join(workdir, "cache.sqlite3"),
+               CONTENT_PACK_DIR=workdir)
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            env=env, cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    def median_ms(key):
+        return statistics.median(result[key] for result in results) * 1000
+
+    print(f"🧊 Cold start over {args.runs} fresh interpreters (medians)")
+    print("=" * 60)
+    print(f"Import streamlit (server start):   {median_ms('streamlit'):8.1f} ms")
+    print(f"First page render (cold worker):   {median_ms('first_render'):8.1f} ms")
+    print(f"Next rerun (warm):                 {median_ms('second_render'):8.1f} ms")
+    print(f"OpenAI client setup on Generate:   {median_ms('client_setup'):8.1f} ms")
+    print(f"Heavy modules loaded by first page: {', '.join(results[-1]['heavy']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Per-click server time for the game navigation buttons.
+Runs app.py under Streamlit's AppTest with pre-seeded batches (no API calls)
+and times Next/Previous/Hint clicks: everything the server runs for a click,
+including any extra rerun it triggers. Full script runs are counted through
+the app's ysg_rerun_seconds metric. AppTest always reruns the whole script,
+so the cost of a fragment-only rerun (what a click costs on a Streamlit with
+st.fragment) is reported from ysg_game_render_seconds.
+
+AppTest in older Streamlit releases (1.28) replays the click on every st.rerun(),
+so measure scripts that still call st.rerun() on a newer Streamlit.
+
+Usage:
+    python benchmarks/bench_navigation.py [--clicks 30]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, APP_DIR)
+
+BUTTONS = ["next_song", "prev_song", "next_quote", "prev_quote", "next_frame", "hint1_frame", "prev_frame"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def seeded_state(count):
+    from games import Movie, Quote, Song
+    return {
+        "videos": [Song(f"vid{n:08d}", f"Song {n}", f"Artist {n}", f"Movie {n}") for n in range(count)],
+        "quotes": [Quote(f"Memorable line {n}", f"Movie {n}", f"Character {n}", "1999") for n in range(count)],
+        "movies": [Movie(f"Movie {n}", "1999", f"Alice meets Bob {n}", f"Person A meets Person B {n}", "Drama")
+                   for n in range(count)],
+    }
+
+
+def click(app, key):
+    """Click a button; returns (seconds, full script runs, full script seconds)"""
+    from metrics import metrics
+    runs_before, script_before = metrics.totals("ysg_rerun_seconds")
+    started = time.perf_counter()
+    app.button(key=key).click().run()
+    elapsed = time.perf_counter() - started
+    runs, script_seconds = metrics.totals("ysg_rerun_seconds")
+    if app.exception:
+        raise SystemExit(f"App raised: {app.exception[0].message}")
+    return elapsed, runs - runs_before, script_seconds - script_before
+
+
+def fragment_seconds():
+    """Mean render time of one game's play area, or None if the app has no fragments"""
+    from metrics import metrics
+    renders, seconds = metrics.totals("ysg_game_render_seconds")
+    return seconds / renders if renders else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time navigation clicks in the Streamlit app")
+    parser.add_argument("--clicks", type=int, default=30, help="Clicks per button")
+    args = parser.parse_args()
+
+    # Keep the run away from the real cache and content packs
+    workdir = tempfile.mkdtemp(prefix="ysg-nav-")
+    os.environ["RESPONSE_CACHE_PATH"] = os.path.join(workdir, "cache.sqlite3")
+    os.environ["CONTENT_PACK_DIR"] = workdir
+
+    import streamlit
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=30)
+    for key, items in seeded_state(args.clicks + 5).items():
+        app.session_state[key] = items
+    app.run()
+
+    timings = {key: [] for key in BUTTONS}
+    runs = script_seconds = 0
+    for _ in range(args.clicks):
+        for key in BUTTONS:
+            elapsed, click_runs, click_script_seconds = click(app, key)
+            timings[key].append(elapsed)
+            runs += click_runs
+            script_seconds += click_script_seconds
+    total_clicks = args.clicks * len(BUTTONS)
+
+    print(f"🖱️ streamlit {streamlit.__version__}, {args.clicks} clicks per button")
+    print("=" * 60)
+    print("Button                 mean (ms)   p95 (ms)")
+    all_clicks = [t for values in timings.values() for t in values]
+    for key, values in list(timings.items()) + [("all", all_clicks)]:
+        print(f"   {key:<18} {sum(values) / len(values) * 1000:9.1f} {percentile(values, 95) * 1000:10.1f}")
+    print(f"Full script runs per click: {runs / total_clicks:.2f}")
+    print(f"Full script time per click: {script_seconds / total_clicks * 1000:.1f} ms")
+    per_fragment = fragment_seconds()
+    if per_fragment is not None:
+        print(f"Fragment-only rerun:        {per_fragment * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for session batches.
+Simulates many sessions playing a handful of popular themes and compares the
+old layout (every session decodes its own list of dicts from the cache) with
+compact records shared through the process-wide batch store.
+
+Usage:
+    python benchmarks/bench_session_memory.py [--sessions 200] [--themes 10]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from fake_llm_server import make_item  # noqa: E402
+from games import GAMES  # noqa: E402
+from item_store import SharedBatches  # noqa: E402
+
+
+def cached_batches(themes, batch_size):
+    """JSON as the response cache stores it, one batch per game and theme"""
+    rng = random.Random(7)
+    batches = {}
+    for spec in GAMES.values():
+        for theme in range(themes):
+            items = [make_item(spec.name, n, rng) for n in range(batch_size)]
+            if spec.name != "songs":
+                batches[(spec.name, theme)] = json.dumps(items)
+                continue
+            records = [record for item in items for record in spec.post_process(item)]
+            batches[(spec.name, theme)] = json.dumps(records)
+    return batches
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    sessions = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-session batch memory")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--themes", type=int, default=10, help="Distinct themes the sessions pick from")
+    parser.add_argument("--batch-size", type=int, default=25)
+    args = parser.parse_args()
+
+    batches = cached_batches(args.themes, args.batch_size)
+    picks = [[(name, number % args.themes) for name in GAMES] for number in range(args.sessions)]
+
+    def legacy_sessions():
+        # Every session decoded its own copy of the cached JSON
+        return [{name: json.loads(batches[(name, theme)]) for name, theme in session} for session in picks]
+
+    def shared_sessions():
+        store = SharedBatches(max_batches=len(batches))
+        sessions = []
+        for session in picks:
+            state = {}
+            for name, theme in session:
+                shared = store.get((name, theme))
+                if shared is None:
+                    spec = GAMES[name]
+                    items = [spec.load_item(item) for item in json.loads(batches[(name, theme)])]
+                    shared = store.share((name, theme), items)
+                state[name] = shared
+            sessions.append(state)
+        return sessions, store
+
+    legacy_bytes, _ = measure(legacy_sessions)
+    shared_bytes, _ = measure(shared_sessions)
+
+    print(f"🧠 {args.sessions} sessions, {args.themes} themes, 3 games x {args.batch_size} items")
+    print("=" * 60)
+    print(f"Per-session dict copies: {legacy_bytes / 1024:10.1f} KB ({legacy_bytes / args.sessions:8.0f} B/session)")
+    print(f"Shared compact records:  {shared_bytes / 1024:10.1f} KB ({shared_bytes / args.sessions:8.0f} B/session)")
+    print(f"Saved: {1 - shared_bytes / legacy_bytes:.1%}")
+
+
+if __name__ == "__main__":
+    main()
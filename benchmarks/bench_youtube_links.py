@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for YouTube video ID extraction.
+Compares the original three-regex extractor with the compiled single-pass one
+over a few thousand URLs, and checks the new extractor on tricky shapes.
+
+Usage:
+    python benchmarks/bench_youtube_links.py [--urls 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from youtube_links import extract_video_ids, extract_youtube_links  # noqa: E402
+
+
+def legacy_extract_youtube_links(text):
+    """The extractor as it was before the single-pass pattern"""
+    patterns = [
+        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]+)',
+        r'(?:https?://)?(?:www\.)?youtu\.be/([a-zA-Z0-9_-]+)',
+        r'(?:https?://)?(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]+)'
+    ]
+    video_ids = []
+    for pattern in patterns:
+        video_ids.extend(re.findall(pattern, text))
+    return list(set(video_ids))
+
+
+URL_SHAPES = [
+    "https://www.youtube.com/watch?v={id}",
+    "https://www.youtube.com/watch?v={id}&t=42s",
+    "https://www.youtube.com/watch?v={id}&list=PL1234567890",
+    "https://m.youtube.com/watch?feature=share&v={id}",
+    "https://music.youtube.com/watch?v={id}",
+    "https://youtu.be/{id}?t=10",
+    "https://www.youtube.com/embed/{id}",
+    "https://www.youtube.com/shorts/{id}",
+    "youtube.com/watch?v={id}",
+]
+
+CHECKS = [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=43s", ["dQw4w9WgXcQ"]),
+    ("https://m.youtube.com/watch?v=dQw4w9WgXcQ", ["dQw4w9WgXcQ"]),
+    ("https://music.youtube.com/watch?v=dQw4w9WgXcQ&list=RDAMVM", ["dQw4w9WgXcQ"]),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", ["dQw4w9WgXcQ"]),
+    ("https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ", ["dQw4w9WgXcQ"]),
+    ("https://youtu.be/dQw4w9WgXcQ https://youtu.be/L0MK7qz13bU https://youtu.be/dQw4w9WgXcQ",
+     ["dQw4w9WgXcQ", "L0MK7qz13bU"]),
+    ("https://www.youtube.com/watch?v=tooShort", []),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQXYZ", []),
+    ("https://www.youtube.com/results?search_query=karaoke", []),
+]
+
+
+def random_id(rng):
+    return "".join(rng.choice(string.ascii_letters + string.digits + "_-") for _ in range(11))
+
+
+def make_urls(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(URL_SHAPES).format(id=random_id(rng)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YouTube ID extraction")
+    parser.add_argument("--urls", type=int, default=5000, help="Number of URLs per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs (best is reported)")
+    args = parser.parse_args()
+
+    print("🧪 Checking extractor on tricky URLs")
+    failures = 0
+    for text, expected in CHECKS:
+        result = extract_youtube_links(text)
+        if result != expected:
+            failures += 1
+            print(f"❌ {text!r}: expected {expected}, got {result}")
+    print("✅ All checks passed" if not failures else f"❌ {failures} checks failed")
+
+    urls = make_urls(args.urls)
+    timings = {
+        "legacy, per link": lambda: [legacy_extract_youtube_links(url) for url in urls],
+        "single-pass, per link": lambda: [extract_youtube_links(url) for url in urls],
+        "single-pass, batch": lambda: extract_video_ids(urls),
+    }
+
+    print("=" * 50)
+    print(f"⏱️ {args.urls} URLs, best of {args.repeat} runs")
+    for name, run in timings.items():
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"   {name:<24} {best * 1000:8.2f} ms  ({best / args.urls * 1e6:.2f} µs/URL)")
+
+
+if __name__ == "__main__":
+    main()
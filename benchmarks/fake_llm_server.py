@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API.
+Answers /v1/chat/completions with made-up songs, quotes or movies in the same
+JSON shape the real prompts ask for, with configurable latency, token rate
+and rates of malformed responses and of 429/503 errors. Streaming (SSE) and
+JSON mode are supported.
+
+Usage:
+    python benchmarks/fake_llm_server.py [--port 8765] [--latency 0.5] [--tokens-per-second 80] [--malformed-rate 0.05] [--error-rate 0.1]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CHARS_PER_TOKEN = 4
+
+
+def make_item(game, n, rng):
+    tag = rng.randrange(10 ** 6)
+    if game == "songs":
+        video_id = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-") for _ in range(11))
+        return {
+            "title": f"Song {n}-{tag}",
+            "source": f"Movie {tag % 97}",
+            "artist": f"Artist {tag % 53}",
+            "link": f"https://www.youtube.com/watch?v={video_id}"
+        }
+    if game == "quotes":
+        return {
+            "quote": f"This is memorable line number {n} ({tag}), said with feeling.",
+            "movie": f"Movie {tag % 97}",
+            "character": f"Character {tag % 31}",
+            "year": str(1950 + tag % 70)
+        }
+    return {
+        "title": f"Movie {n}-{tag}",
+        "year": str(1950 + tag % 70),
+        "description": f"Alice and Bob argue on a rooftop in scene {n}.",
+        "anonymized_description": f"Person A and Person B argue on a rooftop in scene {n}.",
+        "genre": rng.choice(["Drama", "Comedy", "Action", "Sci-Fi"])
+    }
+
+
+def detect_game(system_prompt):
+    if "songs" in system_prompt:
+        return "songs"
+    if "quotes" in system_prompt:
+        return "quotes"
+    return "movies"
+
+
+def build_content(messages, malformed_rate, rng, json_mode=False):
+    system_prompt = messages[0]["content"] if messages else ""
+    user_prompt = messages[-1]["content"] if messages else ""
+    match = re.search(r"Suggest (\d+)", user_prompt)
+    count = int(match.group(1)) if match else 25
+    game = detect_game(system_prompt)
+    items = [make_item(game, n, rng) for n in range(count)]
+    content = json.dumps({"items": items} if json_mode else items, indent=2)
+    if rng.random() < malformed_rate:
+        # Cut the array off mid-item, like a completion that hit max_tokens
+        content = content[:rng.randrange(len(content) // 2, len(content) - 1)]
+    return content
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = None  # Set by serve()
+    requests_served = 0
+    _count_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Clients drop streams once they have enough items
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        settings = self.settings
+        with self._count_lock:
+            FakeChatHandler.requests_served += 1
+        rng = random.Random()
+
+        if rng.random() < settings.error_rate:
+            self._send_error_response(rng)
+            return
+
+        time.sleep(settings.latency)
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = build_content(body.get("messages", []), settings.malformed_rate, rng, json_mode)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake-model")
+        usage = {
+            "prompt_tokens": sum(len(m.get("content", "")) for m in body.get("messages", [])) // CHARS_PER_TOKEN,
+            "completion_tokens": len(content) // CHARS_PER_TOKEN,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if body.get("stream"):
+            self._stream(completion_id, model, content, settings.tokens_per_second)
+            return
+
+        time.sleep(usage["completion_tokens"] / settings.tokens_per_second)
+        payload = json.dumps({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error_response(self, rng):
+        # Half rate limits with a Retry-After hint, half overloaded servers
+        status, message = (429, "Rate limit reached") if rng.random() < 0.5 else (503, "Server overloaded")
+        payload = json.dumps({"error": {"message": message, "type": "fake_error"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", "0.2")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, completion_id, model, content, tokens_per_second):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data):
+            event = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            self.wfile.flush()
+
+        delay = 1 / tokens_per_second
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            send_event(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": content[start:start + CHARS_PER_TOKEN]},
+                    "finish_reason": None
+                }]
+            }))
+            time.sleep(delay)
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def serve(port=8765, latency=0.5, tokens_per_second=80.0, malformed_rate=0.0, background=False,
+          error_rate=0.0):
+    """Start the fake server; with `background` it runs on a daemon thread"""
+    FakeChatHandler.settings = argparse.Namespace(
+        latency=latency,
+        tokens_per_second=tokens_per_second,
+        malformed_rate=malformed_rate,
+        error_rate=error_rate
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeChatHandler)
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        print(f"🤖 Fake LLM server on http://127.0.0.1:{server.server_port}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of truncated responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 429/503 responses")
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.tokens_per_second, args.malformed_rate, error_rate=args.error_rate)
+
+
+if __name__ == "__main__":
+    main()
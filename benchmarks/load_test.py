@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Load test for the generate path.
+Starts the fake LLM server and simulates concurrent players: each session
+presses Generate in all three games and then clicks Next through the batch,
+with prefetching just like the app. Reports time-to-first-item percentiles,
+Next stalls, throughput and error rates. No real API calls are made.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 20] [--nexts 30] [--stream] [--latency 0.5] [--error-rate 0.1]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class LoadResults:
+    """Thread-safe collection of everything the sessions measure"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.first_item = {}
+        self.stalls = []
+        self.generate_attempts = 0
+        self.generate_errors = []
+        self.prefetch_errors = 0
+        self.items = 0
+
+    def record(self, **values):
+        with self._lock:
+            if "game" in values:
+                self.first_item.setdefault(values["game"], []).append(values["seconds"])
+            if "stall" in values:
+                self.stalls.append(values["stall"])
+            self.generate_attempts += values.get("attempt", 0)
+            if "error" in values:
+                self.generate_errors.append(values["error"])
+            self.prefetch_errors += values.get("prefetch_error", 0)
+            self.items += values.get("items", 0)
+
+
+def play_session(number, args, results):
+    import config
+    from games import GAMES
+    from generation import generate_items
+    from json_stream import StreamedItems
+    from prefetch import start_prefetch
+    from seen_set import SeenSet
+
+    for spec in GAMES.values():
+        prompt = f"load test theme {number % args.themes}"
+        seen = SeenSet(spec)
+
+        def fetch():
+            return generate_items(spec, prompt, get_api_key=lambda: "test-key", seen=seen)
+
+        started = time.perf_counter()
+        try:
+            results.record(attempt=1)
+            items = generate_items(spec, prompt, get_api_key=lambda: "test-key", stream=args.stream, seen=seen,
+                                   allow_fallback=True)
+        except Exception as e:
+            results.record(error=f"{spec.name}: {type(e).__name__}: {e}")
+            continue
+        results.record(game=spec.name, seconds=time.perf_counter() - started)
+
+        pending, pending_size = None, None
+        for index in range(1, args.nexts + 1):
+            time.sleep(args.think)
+            streaming = isinstance(items, StreamedItems) and not items.finished.is_set()
+            if pending is not None and pending.done() and pending.exception():
+                results.record(prefetch_error=1)
+                pending = None
+            near_end = len(items) - 1 - index <= config.PREFETCH_THRESHOLD
+            idle = pending is None or (pending.done() and len(items) > pending_size)
+            if near_end and idle and not streaming:
+                pending, pending_size = start_prefetch(items, fetch), len(items)
+
+            if index >= len(items):
+                # The player pressed Next and there is nothing to show yet
+                stall_start = time.perf_counter()
+                while index >= len(items):
+                    still_loading = (pending is not None and not pending.done()) or (
+                        isinstance(items, StreamedItems) and not items.finished.is_set())
+                    if not still_loading:
+                        break
+                    time.sleep(0.01)
+                results.record(stall=time.perf_counter() - stall_start)
+                if index >= len(items):
+                    break
+        results.record(items=len(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent players against a fake LLM")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent player sessions")
+    parser.add_argument("--nexts", type=int, default=30, help="Next clicks per game")
+    parser.add_argument("--think", type=float, default=0.2, help="Seconds between Next clicks")
+    parser.add_argument("--themes", type=int, default=5, help="Distinct themes shared by the sessions")
+    parser.add_argument("--stream", action="store_true", help="Use streaming generation")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake server latency before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake 429/503 responses")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Isolate the run: fresh cache, no content packs, fake provider, no rate cap
+    workdir = tempfile.mkdtemp(prefix="ysg-load-")
+    os.environ["RESPONSE_CACHE_PATH"] = os.path.join(workdir, "cache.sqlite3")
+    os.environ["CONTENT_PACK_DIR"] = workdir
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["OPENAI_REQUESTS_PER_MINUTE"] = "100000"
+    os.environ["OPENAI_RATE_BURST"] = "1000"
+
+    from fake_llm_server import FakeChatHandler, serve
+    from video_check import set_availability_checker
+    set_availability_checker(lambda video_id: True)  # Fake video IDs never reach YouTube
+    from youtube_search import set_search_backend
+    set_search_backend(lambda query: "")  # ...and neither do searches
+    server = serve(args.port, args.latency, args.tokens_per_second, args.malformed_rate, background=True,
+                   error_rate=args.error_rate)
+
+    results = LoadResults()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        for number in range(args.sessions):
+            executor.submit(play_session, number, args, results)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    all_first_items = [t for times in results.first_item.values() for t in times]
+    print(f"🧪 {args.sessions} sessions, {args.nexts} Next clicks per game, stream={args.stream}")
+    print("=" * 60)
+    print("⏱️ Time to first item (s)       p50     p95     p99")
+    for game, times in list(results.first_item.items()) + [("all", all_first_items)]:
+        print(f"   {game:<26} {percentile(times, 50):7.3f} {percentile(times, 95):7.3f} {percentile(times, 99):7.3f}")
+    print(f"🛑 Next stalls: {len(results.stalls)}"
+          f" (p95 {percentile(results.stalls, 95):.3f}s)" if results.stalls else "🛑 Next stalls: 0")
+    print(f"📦 Throughput: {results.items / elapsed:.1f} items/s,"
+          f" {FakeChatHandler.requests_served / elapsed:.2f} upstream requests/s over {elapsed:.1f}s")
+    error_rate = len(results.generate_errors) / results.generate_attempts if results.generate_attempts else 0.0
+    print(f"❌ Generate errors: {len(results.generate_errors)}/{results.generate_attempts} ({error_rate:.1%}),"
+          f" prefetch errors: {results.prefetch_errors}")
+    for error in results.generate_errors[:5]:
+        print(f"   - {error}")
+
+    from resilience import get_resilience_stats
+    resilience = get_resilience_stats()
+    print("🔁 Call outcomes: " + ", ".join(
+        f"{name} {count}" for name, count in sorted(resilience["outcomes"].items())))
+
+    from token_budget import token_budget
+    budget = token_budget.snapshot()
+    print("🧮 Measured tokens per item: " + ", ".join(
+        f"{game} {tokens:.0f}" for game, tokens in budget["tokens_per_item"].items()))
+
+
+if __name__ == "__main__":
+    main()
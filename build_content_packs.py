@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Content Pack Builder
+Pre-generates item banks for a list of themes and writes one pack file per
+game type, so those themes can be played without calling ChatGPT.
+
+Usage:
+    python build_content_packs.py themes.txt [--rounds 4] [--games songs,quotes,movies]
+
+The themes file has one theme per line. The API key is read from the
+OPENAI_API_KEY environment variable (or .env).
+"""
+
+import argparse
+import os
+
+import config
+from content_packs import pack_path, read_content_pack, write_content_pack
+from games import GAMES
+from generation import GenerationError, generate_items
+
+
+def build_bank(spec, theme, rounds):
+    """Generate several batches for one theme and merge them without duplicates"""
+    bank = []
+    for _ in range(rounds):
+        try:
+            batch = generate_items(
+                spec,
+                theme,
+                exclude=bank,
+                get_api_key=lambda: config.OPENAI_API_KEY,
+                use_content_packs=False
+            )
+        except GenerationError as e:
+            print(f"   ⚠️ {e}")
+            break
+        new_items = [item for item in batch if item not in bank]
+        if not new_items:
+            break
+        bank.extend(new_items)
+    return bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build offline content packs")
+    parser.add_argument("themes_file", help="File with one theme per line")
+    parser.add_argument("--rounds", type=int, default=4, help="Batches to generate per theme")
+    parser.add_argument("--games", default=",".join(GAMES), help="Comma-separated game types")
+    args = parser.parse_args()
+
+    with open(args.themes_file, encoding="utf-8") as f:
+        themes = [line.strip() for line in f if line.strip()]
+
+    for game in args.games.split(","):
+        spec = GAMES[game]
+        path = pack_path(game)
+        # Keep themes from an existing pack and add or refresh the requested ones
+        banks = read_content_pack(path) if os.path.exists(path) else {}
+        print(f"📦 Building {game} pack ({len(themes)} themes)")
+        for theme in themes:
+            bank = build_bank(spec, theme, args.rounds)
+            print(f"   - {theme}: {len(bank)} items")
+            if bank:
+                banks[theme] = bank
+        write_content_pack(path, banks)
+        print(f"✅ Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
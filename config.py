@@ -1,8 +1,14 @@
 import os
-from dotenv import load_dotenv
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    # python-dotenv is optional - Streamlit secrets are the primary source
+    load_dotenv = None
 
 # Load environment variables
-load_dotenv()
+if load_dotenv:
+    load_dotenv()
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -11,13 +17,94 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 APP_TITLE = "YouTube Video Game"
 APP_ICON = "🎵"
 DEFAULT_MODEL = "gpt-3.5-turbo"
-MAX_TOKENS = 500
+MAX_TOKENS = 3000  # Ceiling on max_tokens for a single request
 TEMPERATURE = 0.7
 MAX_VIDEOS = 10
 
+# Token Budget Configuration
+BATCH_SIZE = 25  # Items dealt per generated batch
+TOKENS_PER_ITEM_ESTIMATE = 80  # Starting guess until real responses have been measured
+TOKEN_HEADROOM = 1.3  # max_tokens is sized this much above the expected output
+CHUNK_MAX_PARALLEL = 3  # Most parallel requests one batch is split into
+CHUNK_MIN_SAVING_SECONDS = 2.0  # Only split further when it saves at least this much
+CHUNK_DUPLICATE_RATE_ESTIMATE = 0.3  # Share of chunk items assumed to repeat another chunk until measured
+
+# Response Cache Configuration
+CACHE_DB_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 500
+PROMPT_SIMILARITY_THRESHOLD = 0.75  # Trigram similarity needed to reuse another prompt's batch
+
+# OpenAI Connection Pool Configuration
+OPENAI_POOL_MAX_CONNECTIONS = 20
+OPENAI_POOL_MAX_KEEPALIVE = 10
+OPENAI_KEEPALIVE_EXPIRY = 60
+OPENAI_CONNECT_TIMEOUT = 10
+OPENAI_READ_TIMEOUT = 60
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "60"))
+OPENAI_RATE_BURST = int(os.getenv("OPENAI_RATE_BURST", "5"))
+
+# Resilience Configuration
+OPENAI_MAX_RETRIES = 3
+OPENAI_RETRY_BASE_DELAY = 0.5  # Seconds; doubled on each retry, with full jitter
+OPENAI_RETRY_MAX_DELAY = 8
+OPENAI_REQUEST_DEADLINE = 45  # Seconds one call may spend on attempts and backoff
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures before a model's circuit opens
+CIRCUIT_RESET_SECONDS = 30
+FALLBACK_MODEL = os.getenv("OPENAI_FALLBACK_MODEL", "gpt-4o-mini")
+
+# Batch Generation Configuration
+BATCH_MAX_PARALLEL = 3
+
+# Seen-Set Configuration
+MAX_PROMPT_EXCLUSIONS = 40  # Most recent already-played items named in a prompt
+
+# Session Memory Configuration
+SHARED_BATCHES_MAX = 200  # Immutable batches kept in memory for every session to share
+SESSION_IDLE_SECONDS = 30 * 60  # Sessions idle this long have their batches evicted
+
+# Game State Configuration
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")  # "memory" (this process only) or "sqlite" (shared by every process)
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "game_state.sqlite3")
+STATE_TTL_SECONDS = 7 * 24 * 60 * 60  # Games not played for this long can no longer be resumed
+STATE_MEMORY_MAX_GAMES = 1000  # Games the in-memory backend keeps
+
+# Streaming Configuration
+STREAM_RESPONSES = True
+
+# Structured Output Configuration
+JSON_MODE = True  # Ask for response_format=json_object where the model supports it
+
+# Instrumentation Configuration
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Serve Prometheus text on localhost:PORT/metrics; 0 disables
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Open ?admin=<token> to show the admin tab
+PROFILE_RERUN = os.getenv("PROFILE_RERUN", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Prefetch Configuration
+PREFETCH_THRESHOLD = 5  # Start fetching the next batch this many items before the end
+PREFETCH_WORKERS = 4
+PREFETCH_RETRY_SECONDS = 15  # Wait this long before retrying a prefetch that failed
+
+# Offline Content Pack Configuration
+CONTENT_PACK_DIR = os.getenv("CONTENT_PACK_DIR", "content_packs")
+OFFLINE_MODE = os.getenv("OFFLINE_MODE", "").lower() in ("1", "true", "yes")
+
+# Video Availability Check Configuration
+VIDEO_CHECK_ENABLED = True
+VIDEO_OEMBED_URL = os.getenv("VIDEO_OEMBED_URL", "https://www.youtube.com/oembed")
+VIDEO_CHECK_TIMEOUT = 5
+VIDEO_CHECK_TTL_SECONDS = 24 * 60 * 60
+VIDEO_CHECK_WORKERS = 8
+
 # YouTube Configuration
 YOUTUBE_SEARCH_LIMIT = 10
 
+# YouTube Search Fallback Configuration
+VIDEO_SEARCH_ENABLED = True  # Search "title artist karaoke" for songs without a usable video
+VIDEO_SEARCH_WORKERS = 4  # Searches run at once across every session
+VIDEO_SEARCH_TTL_SECONDS = 30 * 24 * 60 * 60  # How long a query's answer is cached
+
 # UI Configuration
 MAIN_COLOR = "#FF6B6B"
 SECONDARY_COLOR = "#4ECDC4" 
\ No newline at end of file
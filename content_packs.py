@@ -0,0 +1,153 @@
+"""
+Offline content packs: pre-generated item banks for popular themes.
+
+Each game type has one pack file laid out as
+    MAGIC | index length (8 bytes, little endian) | JSON index | item data
+where the index maps a normalized theme to the byte range of its items, stored
+as one JSON document per line. Packs are memory-mapped, so serving a sample
+only parses the lines that were picked.
+"""
+
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+
+import config
+
+
+MAGIC = b"YSGPACK1"
+_HEADER = struct.Struct("<Q")
+
+
+def normalize_theme(theme):
+    """Normalize a theme the same way the response cache normalizes prompts"""
+    return " ".join(theme.lower().split())
+
+
+def _encode(item):
+    return json.dumps(item, separators=(",", ":")).encode("utf-8")
+
+
+def pack_path(game):
+    """Return the pack file path for a game type"""
+    return os.path.join(config.CONTENT_PACK_DIR, f"{game}.pack")
+
+
+def write_content_pack(path, banks):
+    """Write {theme: [items]} to a pack file, replacing it atomically"""
+    index = {}
+    data = bytearray()
+    for theme, items in banks.items():
+        if not items:
+            continue
+        blob = b"\n".join(_encode(item) for item in items)
+        index[normalize_theme(theme)] = [len(data), len(blob), len(items)]
+        data += blob
+
+    index_bytes = json.dumps(index).encode("utf-8")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(index_bytes)))
+        f.write(index_bytes)
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_content_pack(path):
+    """Read a whole pack back into {theme: [items]} (used when extending a pack)"""
+    pack = ContentPack(path)
+    try:
+        return {theme: pack.items(theme) for theme in pack.themes()}
+    finally:
+        pack.close()
+
+
+class ContentPack:
+    """Read-only, memory-mapped view of one pack file"""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a content pack")
+        (index_length,) = _HEADER.unpack_from(self._map, len(MAGIC))
+        index_start = len(MAGIC) + _HEADER.size
+        self._index = json.loads(self._map[index_start:index_start + index_length])
+        self._data_start = index_start + index_length
+
+    def themes(self):
+        return list(self._index)
+
+    def _lines(self, theme):
+        entry = self._index.get(normalize_theme(theme))
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        start = self._data_start + offset
+        return self._map[start:start + length].split(b"\n")
+
+    def items(self, theme):
+        """Return every item stored for a theme, or None if it is not in the pack"""
+        lines = self._lines(theme)
+        if lines is None:
+            return None
+        return [json.loads(line) for line in lines]
+
+    def sample(self, theme, count, exclude=None, skip=None):
+        """Return a random sample of a theme's items, skipping excluded ones.
+
+        `skip` is called with each parsed item; items it returns True for (e.g.
+        ones the session was already dealt) are passed over, and the walk goes
+        on through the shuffled lines until `count` items are found.
+        """
+        lines = self._lines(theme)
+        if lines is None:
+            return None
+        random.shuffle(lines)
+        # Compare serialized forms so records and their JSON lists match
+        excluded = {_encode(item) for item in exclude or []}
+        sample = []
+        for line in lines:
+            if line in excluded:
+                continue
+            item = json.loads(line)
+            if skip is not None and skip(item):
+                continue
+            sample.append(item)
+            if len(sample) >= count:
+                break
+        return sample
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_packs = {}
+_packs_lock = threading.Lock()
+
+
+def get_content_pack(game):
+    """Return the memory-mapped pack for a game type, or None if there is none"""
+    with _packs_lock:
+        if game not in _packs:
+            path = pack_path(game)
+            try:
+                _packs[game] = ContentPack(path) if os.path.getsize(path) else None
+            except (OSError, ValueError):
+                _packs[game] = None
+        return _packs[game]
+
+
+def sample_from_packs(game, theme, count, exclude=None, skip=None):
+    """Serve a batch from the game's content pack, or None for unknown themes"""
+    pack = get_content_pack(game)
+    if pack is None:
+        return None
+    return pack.sample(theme, count, exclude, skip) or None
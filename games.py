@@ -0,0 +1,221 @@
+"""
+Game mode descriptors for the generation engine.
+Adding a game mode means adding a GameSpec here and a tab in app.py.
+"""
+
+from typing import NamedTuple
+
+from generation import GameSpec
+from item_store import compact_record
+from youtube_links import extract_youtube_links
+
+
+class Song(NamedTuple):
+    """Everything the song game needs about one song, kept compact as a tuple"""
+    video_id: str
+    title: str
+    artist: str
+    source: str
+
+    @classmethod
+    def from_json(cls, data):
+        """Rebuild a Song read back from the cache or a content pack"""
+        if isinstance(data, str):
+            return cls(data, "", "", "")  # Batches stored before songs kept metadata
+        return compact_record(cls, data)
+
+
+class Quote(NamedTuple):
+    """One movie quote with what the reveal shows about it"""
+    quote: str
+    movie: str
+    character: str
+    year: str
+
+    @classmethod
+    def from_json(cls, data):
+        return load_record(cls, data)
+
+
+class Movie(NamedTuple):
+    """One movie with the scene descriptions the frame game shows"""
+    title: str
+    year: str
+    description: str
+    anonymized_description: str
+    genre: str
+
+    @classmethod
+    def from_json(cls, data):
+        return load_record(cls, data)
+
+
+def load_record(cls, data):
+    """Build a record from a suggested item dict or a stored JSON list"""
+    if isinstance(data, dict):
+        return compact_record(cls, (str(data.get(field) or '') for field in cls._fields))
+    return compact_record(cls, data)
+
+
+def song_records(song):
+    """Turn one suggested song into a Song per video ID found in its link.
+
+    A song whose link holds no video ID is kept with an empty one, so
+    available_songs can find it on YouTube instead.
+    """
+    video_ids = extract_youtube_links(song.get('link') or '') or ['']
+    return [
+        compact_record(Song, (video_id, song.get('title', ''), song.get('artist', ''), song.get('source', '')))
+        for video_id in video_ids
+    ]
+
+
+def available_songs(songs):
+    """Keep songs with a playable video, searching YouTube for songs without one"""
+    # Loaded with the first song batch: the checker brings in requests and a thread pool
+    from video_check import filter_available
+    from youtube_search import resolve_videos, search_query
+
+    playable = {id(song) for song in filter_available([song for song in songs if song.video_id],
+                                                       video_id=lambda song: song.video_id)}
+    unplayable = [song for song in songs if id(song) not in playable]
+
+    # Missing and dead videos are replaced by what a karaoke search finds
+    replacements = {}
+    if unplayable:
+        found = resolve_videos(search_query(song.title, song.artist) for song in unplayable)
+        candidates = []
+        for song in unplayable:
+            video_id = found[search_query(song.title, song.artist)]
+            if video_id and video_id != song.video_id:
+                candidates.append((song, compact_record(Song, (video_id,) + tuple(song[1:]))))
+        checked = {id(record) for record in filter_available([record for _, record in candidates],
+                                                             video_id=lambda song: song.video_id)}
+        replacements = {id(song): record for song, record in candidates if id(record) in checked}
+
+    # Keep the batch order; a search may land on a video another song already has
+    kept, video_ids = [], set()
+    for song in songs:
+        song = song if id(song) in playable else replacements.get(id(song))
+        if song is not None and song.video_id not in video_ids:
+            video_ids.add(song.video_id)
+            kept.append(song)
+    return kept
+
+
+def format_song(song):
+    """'Title by Artist' for a song dict or a Song record"""
+    if isinstance(song, dict):
+        return f"{song['title']} by {song['artist']}"
+    return f"{song.title} by {song.artist}"
+
+
+SONGS = GameSpec(
+    name="songs",
+    plural="songs",
+    system_prompt="""You are a helpful assistant that suggests songs based on user prompts.
+        For each suggestion, provide:
+        1. The song title
+        2. The movie/show/game it's from (if applicable)
+        3. The artist/band name
+        4. link to youtube - KARAOKE VERSION
+
+        Return the information in this exact JSON format:
+        [
+            {
+                "title": "Song Title",
+                "source": "Movie/Show/Game Name",
+                "artist": "Artist/Band Name",
+                "link": "url link"
+            }
+        ]
+
+        Return exactly {count} songs. Make sure the JSON is valid and return only the json.""",
+    request="Suggest {count} songs related to: {prompt}",
+    fields=("title", "source", "artist", "link"),
+    required=("title", "artist"),  # Songs without a link are found by search
+    format_exclude=format_song,
+    identity=format_song,
+    post_process=song_records,
+    # Dead or non-embeddable videos are dropped before players reach them
+    validate=available_songs,
+    load_item=Song.from_json
+)
+
+def format_quote(quote):
+    """Start of the quote text for a quote dict or a Quote record"""
+    if isinstance(quote, dict):
+        quote = Quote.from_json(quote)
+    return quote.quote[:50]
+
+
+QUOTES = GameSpec(
+    name="quotes",
+    plural="quotes",
+    system_prompt="""You are a helpful assistant that suggests famous movie quotes based on user prompts.
+        For each suggestion, provide:
+        1. The quote text
+        2. The movie/show it's from
+        3. The character who said it (if known)
+        4. The year of the movie/show (if known)
+
+        Return the information in this exact JSON format:
+        [
+            {
+                "quote": "The actual quote text here",
+                "movie": "Movie/Show Name",
+                "character": "Character Name",
+                "year": "Year"
+            }
+        ]
+
+        Return exactly {count} quotes. Make sure the JSON is valid and return only the json.""",
+    request="Suggest {count} famous movie quotes related to: {prompt}",
+    fields=("quote", "movie", "character", "year"),
+    required=("quote", "movie"),
+    format_exclude=lambda quote: f"{format_quote(quote)}...",
+    identity=format_quote,
+    post_process=lambda quote: [Quote.from_json(quote)],
+    load_item=Quote.from_json
+)
+
+def format_movie(movie):
+    """'Title (Year)' for a movie dict or a Movie record"""
+    if isinstance(movie, dict):
+        movie = Movie.from_json(movie)
+    return f"{movie.title} ({movie.year})"
+
+
+MOVIES = GameSpec(
+    name="movies",
+    plural="movies",
+    system_prompt="""You are a helpful assistant that suggests famous movies based on user prompts.
+        For each suggestion, provide:
+        1. The movie title
+        2. The year of the movie
+        3. A brief description of a memorable scene or frame (with character names)
+        4. The genre of the movie
+        5. An anonymized version of the scene description (replace character names with "Person A", "Person B", etc.)
+
+        Return the information in this exact JSON format:
+        [
+            {
+                "title": "Movie Title",
+                "year": "Year",
+                "description": "Brief description of a memorable scene with character names",
+                "anonymized_description": "Same scene but with Person A, Person B, etc. instead of names",
+                "genre": "Genre"
+            }
+        ]
+
+        Return exactly {count} movies. Make sure the JSON is valid and return only the json.""",
+    request="Suggest {count} famous movies related to: {prompt}",
+    fields=("title", "year", "description", "anonymized_description", "genre"),
+    required=("title", "year", "description", "anonymized_description"),
+    format_exclude=format_movie,
+    identity=format_movie,
+    post_process=lambda movie: [Movie.from_json(movie)],
+    load_item=Movie.from_json
+)
+
+GAMES = {spec.name: spec for spec in (SONGS, QUOTES, MOVIES)}
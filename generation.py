@@ -0,0 +1,513 @@
+"""
+Shared generation engine for every game mode.
+Prompt assembly, caching, the ChatGPT request, streaming and JSON extraction
+live here once; each game only supplies a GameSpec (see games.py).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import config
+from content_packs import get_content_pack, sample_from_packs
+from item_store import shared_batches
+from metrics import metrics
+from json_stream import JsonArrayStream, StreamedItems, stream_json_items
+from openai_pool import get_openai_client, rate_limiter
+from prompt_index import get_prompt_index
+from resilience import ProviderUnavailable, outcomes, resilient_call
+from response_cache import get_response_cache
+from single_flight import in_flight
+from token_budget import CHARS_PER_TOKEN, token_budget
+
+
+MODEL = config.DEFAULT_MODEL
+TEMPERATURE = config.TEMPERATURE
+BATCH_SIZE = config.BATCH_SIZE
+
+# JSON mode only allows a top-level object, so the array is wrapped in one
+JSON_MODE_INSTRUCTION = '\n\n        Wrap the array in a JSON object under the key "items": {"items": [...]}'
+
+# Models that rejected response_format, so later requests skip it
+_json_mode_unsupported = set()
+_json_mode_lock = threading.Lock()
+
+
+class GenerationError(Exception):
+    """Raised when ChatGPT does not return a usable batch"""
+
+
+class FallbackBatch(list):
+    """A batch served from cached content because ChatGPT was unavailable"""
+
+
+@dataclass(frozen=True)
+class GameSpec:
+    """Everything the engine needs to know about one game mode"""
+    name: str
+    plural: str
+    system_prompt: str
+    request: str
+    fields: tuple
+    required: tuple  # Fields every item must have a non-empty value for
+    format_exclude: Callable
+    identity: Callable
+    post_process: Callable = lambda item: [item]
+    validate: Optional[Callable] = None  # Filters a batch down to usable items
+    load_item: Optional[Callable] = None  # Rebuilds an item read back from JSON
+
+
+def format_exclusions(spec, exclude):
+    """Format an explicit exclude list of item dicts or records for the prompt"""
+    if exclude and isinstance(exclude, list) and len(exclude) > 0 and isinstance(exclude[0], (dict, tuple)):
+        return [spec.format_exclude(item) for item in exclude]
+    return []
+
+
+def build_messages(spec, prompt, exclude_list, count=BATCH_SIZE):
+    """Compose the system and user messages for a request of `count` items"""
+    user_prompt = spec.request.format(prompt=prompt, count=count)
+    if exclude_list:
+        user_prompt = f"{user_prompt}. Please avoid these {spec.plural}: {', '.join(exclude_list)}"
+    return [
+        {"role": "system", "content": spec.system_prompt.replace("{count}", str(count))},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def completion_deltas(response):
+    """Yield the text deltas of a streamed chat completion"""
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def is_valid_item(spec, item):
+    """Check a parsed object against the game's schema"""
+    if not isinstance(item, dict):
+        return False
+    for field in spec.required:
+        value = item.get(field)
+        if not isinstance(value, (str, int)) or not str(value).strip():
+            return False
+    return True
+
+
+def schema_items(spec, item):
+    """Post-process one parsed object, dropping it if it breaks the schema"""
+    if not is_valid_item(spec, item):
+        metrics.inc("ysg_invalid_items_total", game=spec.name)
+        return []
+    return spec.post_process(item)
+
+
+def parse_items(spec, response_content):
+    """Extract every complete item from a response and post-process it.
+
+    The array may be bare or wrapped in a JSON-mode object, and a response cut
+    off mid-item (e.g. at max_tokens) still yields the items before the cut.
+    """
+    if '[' not in response_content:
+        raise GenerationError("No valid JSON found in ChatGPT response")
+    data = JsonArrayStream().feed(response_content)
+    if not data:
+        raise GenerationError("Failed to parse JSON from ChatGPT response: no complete items")
+
+    items = []
+    for item in data:
+        items.extend(schema_items(spec, item))
+    return items
+
+
+def create_completion(client, request, consume=None):
+    """Create a chat completion through the retry, circuit breaker and fallback model layer.
+
+    Returns the response, or what `consume(response, model, started)` made of
+    it, and the model that answered. `consume` runs inside each attempt, so a
+    stream that fails before its first item is retried like the request
+    itself; `started` is when the request was sent, after any rate limiter wait.
+    """
+    def attempt(model, timeout):
+        rate_limiter.acquire()
+        started = time.perf_counter()
+        response = json_mode_completion(client, dict(request, model=model, timeout=timeout))
+        return consume(response, model, started) if consume else response
+
+    return resilient_call(attempt, request["model"])
+
+
+def json_mode_completion(client, request):
+    """Create a chat completion, in JSON mode when the model supports it"""
+    import openai  # Already loaded with the client (see openai_pool), so this is free
+
+    model = request["model"]
+    if not config.JSON_MODE or model in _json_mode_unsupported:
+        return client.chat.completions.create(**request)
+
+    messages = [dict(message) for message in request["messages"]]
+    messages[0]["content"] += JSON_MODE_INSTRUCTION
+    try:
+        return client.chat.completions.create(
+            **{**request, "messages": messages, "response_format": {"type": "json_object"}}
+        )
+    except openai.BadRequestError as e:
+        if "response_format" not in str(e):
+            raise
+        # Older models reject JSON mode; remember that and ask for the bare array
+        with _json_mode_lock:
+            _json_mode_unsupported.add(model)
+        return client.chat.completions.create(**request)
+
+
+def completion_tokens(response, content):
+    """Tokens a completion used, estimated from its length if usage is missing"""
+    usage = getattr(response, "usage", None)
+    if usage is not None and usage.completion_tokens:
+        return usage.completion_tokens
+    return len(content) // CHARS_PER_TOKEN
+
+
+def request_chunk(spec, client, messages, count, max_tokens):
+    """Send one non-streamed request and return its parsed items"""
+    # Only the answered request is timed: limiter waits and retry backoff would skew the latency fit
+    (response, elapsed), model = create_completion(client, dict(
+        model=MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=TEMPERATURE
+    ), lambda response, model, started: (response, time.perf_counter() - started))
+    metrics.observe("ysg_llm_request_seconds", elapsed, game=spec.name, mode="batch")
+    content = response.choices[0].message.content.strip()
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.inc("ysg_llm_tokens_total", usage.prompt_tokens or 0, game=spec.name, kind="prompt")
+    metrics.inc("ysg_llm_tokens_total", completion_tokens(response, content), game=spec.name, kind="completion")
+
+    try:
+        with metrics.timer("ysg_parse_seconds", game=spec.name):
+            items = parse_items(spec, content)
+    except GenerationError:
+        metrics.inc("ysg_parse_failures_total", game=spec.name)
+        raise
+    token_budget.record(spec.name, model, completion_tokens(response, content), len(items), elapsed)
+    return items[:count]
+
+
+def request_batch(spec, prompt, exclude_list, count, api_key, stream=False, on_complete=None):
+    """Ask ChatGPT for `count` items.
+
+    `on_complete` receives every parsed item (for caching), but only when the
+    response completed and held at least `count` items, so a short batch is
+    never cached for later sessions. With `stream` the items are returned as a
+    live list that keeps filling in the background.
+    The token budget sizes max_tokens and may split a non-streamed batch into
+    parallel chunks.
+    """
+    client = get_openai_client(api_key)
+    plan = token_budget.plan(spec.name, MODEL, count, allow_split=not stream)
+
+    # Stream the batch so the first item is playable right away
+    if stream:
+        count = plan.chunks[0]
+
+        def measured_deltas(response, timing):
+            try:
+                for delta in completion_deltas(response):
+                    if timing["first_token"] is None:
+                        timing["first_token"] = time.perf_counter() - timing["started"]
+                    timing["chars"] += len(delta)
+                    yield delta
+            finally:
+                response.close()  # Hand the pooled connection back even if parsing stopped early
+
+        def record_stream(parsed, timing):
+            elapsed = time.perf_counter() - timing["started"]
+            metrics.observe("ysg_llm_request_seconds", elapsed, game=spec.name, mode="stream")
+            if timing["first_token"] is not None:
+                metrics.observe("ysg_llm_first_token_seconds", timing["first_token"], game=spec.name)
+            metrics.inc("ysg_llm_tokens_total", timing["chars"] // CHARS_PER_TOKEN, game=spec.name, kind="completion")
+            token_budget.record(spec.name, timing["model"], timing["chars"] // CHARS_PER_TOKEN, len(parsed),
+                                elapsed, timing["first_token"])
+            if on_complete and len(parsed) >= count:
+                on_complete(parsed)
+
+        def consume(response, model, started):
+            # Each attempt times its own stream, under the model that answered
+            timing = {"model": model, "started": started, "first_token": None, "chars": 0}
+            items = stream_json_items(
+                measured_deltas(response, timing),
+                limit=count,
+                transform=lambda item: schema_items(spec, item),
+                on_complete=lambda parsed: record_stream(parsed, timing)
+            )
+            if not items and items.error is not None:
+                # The connection failed before any item arrived: let the resilience layer retry
+                raise items.error
+            return items
+
+        items, _ = create_completion(client, dict(
+            model=MODEL,
+            messages=build_messages(spec, prompt, exclude_list, count),
+            max_tokens=plan.max_tokens,
+            temperature=TEMPERATURE,
+            stream=True
+        ), consume)
+        if not items:
+            metrics.inc("ysg_parse_failures_total", game=spec.name)
+            raise GenerationError("No valid JSON found in ChatGPT response")
+        return items
+
+    if len(plan.chunks) == 1:
+        messages = build_messages(spec, prompt, exclude_list, count)
+        items = request_chunk(spec, client, messages, count, plan.max_tokens)
+    else:
+        items = request_chunks(spec, client, prompt, exclude_list, plan)
+    items = items[:count]
+    if on_complete and len(items) >= count:
+        on_complete(items)
+    return items
+
+
+def request_chunks(spec, client, prompt, exclude_list, plan):
+    """Request a batch as parallel chunks and merge them.
+
+    Chunks cannot see each other, so items suggested twice are dropped here and
+    the caller's top-up covers the difference.
+    """
+    with ThreadPoolExecutor(max_workers=len(plan.chunks), thread_name_prefix="chunk") as executor:
+        futures = [
+            executor.submit(request_chunk, spec, client,
+                            build_messages(spec, prompt, exclude_list, size), size, plan.max_tokens)
+            for size in plan.chunks
+        ]
+
+    merged = {}
+    returned = 0
+    errors = []
+    for future in futures:
+        try:
+            for item in future.result():
+                merged.setdefault(spec.identity(item).lower(), item)
+                returned += 1
+        except Exception as e:
+            errors.append(e)
+    if errors and not merged:
+        raise errors[0]
+    # How often chunks repeat each other decides whether splitting pays off next time
+    token_budget.record_chunks(spec.name, returned, len(merged))
+    return list(merged.values())
+
+
+def prompt_exclusions(exclude_list, seen):
+    """Merge explicit and already-seen exclusions, capped to keep prompts short"""
+    exclusions = exclude_list + (seen.exclusions() if seen is not None else [])
+    return list(dict.fromkeys(exclusions))[-config.MAX_PROMPT_EXCLUSIONS:]
+
+
+def cached_fallback(spec, prompt, keep_new):
+    """Assemble a playable batch from cached content while ChatGPT is unavailable.
+
+    Draws on a similar theme's batch, the game's most recent cached batches and
+    a random content pack theme, in a fresh shuffle for each session.
+    """
+    candidates = get_prompt_index().find_batch(spec.name, prompt) or []
+    for batch in get_response_cache().recent(spec.name):
+        candidates.extend(batch)
+    pack = get_content_pack(spec.name)
+    if pack is not None and pack.themes():
+        candidates.extend(pack.sample(random.choice(pack.themes()), BATCH_SIZE) or [])
+    if spec.load_item is not None:
+        candidates = [spec.load_item(item) for item in candidates]
+
+    unique = list({spec.identity(item).lower(): item for item in candidates}.values())
+    random.shuffle(unique)
+    kept = FallbackBatch()
+    # Filter a slice at a time so the seen-set only records what is dealt
+    for start in range(0, len(unique), BATCH_SIZE):
+        kept.extend(keep_new(unique[start:start + BATCH_SIZE]))
+        if len(kept) >= BATCH_SIZE:
+            break
+    del kept[BATCH_SIZE:]
+    return kept
+
+
+@metrics.timed("ysg_generate_seconds", lambda spec, *args, **kwargs: {"game": spec.name})
+def generate_items(spec, prompt, exclude=None, get_api_key=None, stream=False,
+                   use_content_packs=True, seen=None, allow_fallback=False):
+    """Generate a batch of items for a game mode.
+
+    Themes covered by an offline content pack and cached batches are returned
+    without contacting ChatGPT, so the API key is only requested (through
+    `get_api_key`) when a request is really needed. With `stream` the returned
+    list keeps filling in the background as the response arrives. Identical
+    requests made at the same time by other sessions share one ChatGPT call,
+    and sessions served a shared batch each get their own shuffle of it. If
+    ChatGPT stays unavailable after retries and `allow_fallback` is set, a
+    FallbackBatch of cached content from other themes is returned instead;
+    it is only meant for a player pressing Generate, never for filling a
+    theme's batch (prefetch, content pack builds).
+
+    Items the session's `seen` set already holds, and items the spec's
+    `validate` hook rejects, are dropped locally. A top-up is then requested
+    for just the number missing, which also covers items lost to a truncated
+    response or a schema check.
+    """
+    exclude_list = format_exclusions(spec, exclude)
+    items = None
+
+    # Popular themes are served straight from the offline content packs
+    if use_content_packs:
+        skip = None
+        if seen is not None:
+            # Sample only what this session hasn't been dealt, rather than dropping it afterwards
+            load = spec.load_item or (lambda item: item)
+            skip = lambda item: load(item) in seen
+        items = sample_from_packs(spec.name, prompt, BATCH_SIZE, exclude, skip)
+        if items is not None:
+            metrics.inc("ysg_batch_source_total", game=spec.name, source="content_pack")
+            if spec.load_item is not None:
+                items = [spec.load_item(item) for item in items]
+
+    # Serve repeated requests from the batches sessions already share in memory
+    cache = get_response_cache()
+    cache_key = cache.make_key(spec.name, prompt, MODEL, exclude_list)
+    if items is None:
+        items = shared_batches.get(cache_key)
+        if items is not None:
+            metrics.inc("ysg_batch_source_total", game=spec.name, source="shared")
+            cache.count("hits")
+            random.shuffle(items)
+
+    # ...then from the response cache
+    if items is None:
+        items = cache.get(cache_key)
+        if items is None and not exclude:
+            # Near-identical themes share the batch of a similar earlier prompt
+            items = get_prompt_index().find_batch(spec.name, prompt)
+        if items is not None:
+            metrics.inc("ysg_batch_source_total", game=spec.name, source="cache")
+            if spec.load_item is not None:
+                items = [spec.load_item(item) for item in items]
+            items = shared_batches.share(cache_key, items)
+
+    def checked_api_key():
+        if config.OFFLINE_MODE:
+            raise GenerationError("Offline mode: no content pack or cached batch for this theme.")
+        api_key = get_api_key() if get_api_key else None
+        if not api_key:
+            raise GenerationError("OpenAI API key not found in Streamlit secrets!")
+        return api_key
+
+    def keep_new(batch):
+        # Drop items this session has already been dealt, then unusable ones
+        if seen is not None:
+            batch = [item for item in batch if seen.add(item)]
+        if spec.validate is not None and batch:
+            batch = spec.validate(batch)
+        return batch
+
+    store = None  # Set when this session made the request and caches its result
+    if items is None:
+        def store_batch(batch):
+            shared_batches.share(cache_key, batch)
+            cache.put(cache_key, spec.name, batch)
+            if not exclude:
+                get_prompt_index().add(spec.name, prompt, cache_key)
+
+        exclusions = prompt_exclusions(exclude_list, seen)
+
+        def fetch():
+            return request_batch(
+                spec,
+                prompt,
+                exclusions,
+                BATCH_SIZE,
+                checked_api_key(),
+                stream=stream,
+                on_complete=store_batch
+            )
+
+        # Every session in the flight filters the shared result on its own
+        try:
+            batch, led = in_flight.run((cache_key, tuple(exclusions)), fetch)
+        except ProviderUnavailable as e:
+            if not allow_fallback:
+                raise GenerationError("ChatGPT is unavailable right now. Please try again in a minute.") from e
+            fallback = cached_fallback(spec, prompt, keep_new)
+            if not fallback:
+                raise GenerationError("ChatGPT is unavailable right now and there is no cached content to play instead. Please try again in a minute.") from e
+            outcomes.count("fallback_cache")
+            metrics.inc("ysg_batch_source_total", game=spec.name, source="fallback")
+            return fallback
+        metrics.inc("ysg_batch_source_total", game=spec.name, source="live" if led else "coalesced")
+        if isinstance(batch, StreamedItems):
+            if stream:
+                items = batch.follow(BATCH_SIZE, accept=lambda item: bool(keep_new([item])))
+                if not items:
+                    raise GenerationError(f"ChatGPT only suggested {spec.plural} you've already played or that aren't available. Try a different prompt.")
+                return items
+            batch.finished.wait()
+            batch = batch.parsed
+        items = list(batch) if led else random.sample(batch, len(batch))
+        if led and len(items) < BATCH_SIZE:
+            store = store_batch  # request_batch didn't cache the short response
+
+    # Top up the shortfall left by dropped or missing items, whatever the source:
+    # a short cached or salvaged batch is topped up rather than played short
+    kept = keep_new(items)
+    missing = BATCH_SIZE - len(kept)
+    if missing > 0:
+        try:
+            top_up = request_batch(
+                spec,
+                prompt,
+                prompt_exclusions(exclude_list, seen),
+                missing,
+                checked_api_key()
+            )
+            kept.extend(keep_new(top_up))
+            if store is not None:
+                # Cache the batch once it is whole, so later sessions don't start short
+                whole = list({spec.identity(item).lower(): item for item in items + top_up}.values())
+                if len(whole) >= BATCH_SIZE:
+                    store(whole[:BATCH_SIZE])
+        except Exception:
+            if not kept:
+                raise
+    return kept[:BATCH_SIZE]
+
+
+def generate_many(requests, get_api_key=None, seen_sets=None, max_parallel=None,
+                  allow_fallback=False):
+    """Generate batches for several (spec, prompt) pairs concurrently.
+
+    At most `max_parallel` requests run at once (BATCH_MAX_PARALLEL by default)
+    and all of them share the provider rate limiter. Returns one entry per
+    request, in order: its items, or the exception it raised. `allow_fallback`
+    is passed on to generate_items.
+    """
+    seen_sets = seen_sets or {}
+    workers = max(1, min(max_parallel or config.BATCH_MAX_PARALLEL, len(requests)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        futures = [
+            executor.submit(
+                generate_items,
+                spec,
+                prompt,
+                get_api_key=get_api_key,
+                seen=seen_sets.get(spec.name),
+                allow_fallback=allow_fallback
+            )
+            for spec, prompt in requests
+        ]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
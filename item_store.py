@@ -0,0 +1,172 @@
+"""
+Compact, shared storage for generated items.
+Records are tuples of interned strings, and each batch is kept once per
+process as an immutable tuple keyed by its cache key, so sessions only hold
+references to shared records instead of their own copies. Sessions that stay
+idle have their batches evicted, and memory_report() shows what each costs.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+EVICTION_NOTICES = 1000  # Evicted sessions remembered so a returning player can be told
+
+def compact_record(cls, values):
+    """Build a record whose strings are interned, so repeats share memory"""
+    return cls(*(sys.intern(value) if isinstance(value, str) else value for value in values))
+
+
+def record_bytes(record):
+    """Approximate size of one record: the tuple plus the values it holds"""
+    size = sys.getsizeof(record)
+    if isinstance(record, tuple):
+        size += sum(sys.getsizeof(value) for value in record)
+    elif isinstance(record, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in record.items())
+    return size
+
+
+class SharedBatches:
+    """Process-wide LRU of immutable batches, shared by every session"""
+
+    def __init__(self, max_batches):
+        self.max_batches = max_batches
+        self._lock = threading.Lock()
+        self._batches = OrderedDict()
+        self._record_ids = {}  # id(record) -> number of stored batches holding it
+
+    def get(self, batch_id):
+        """Return a session-owned list of the shared records, or None"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            self._batches.move_to_end(batch_id)
+            return list(batch)
+
+    def share(self, batch_id, items):
+        """Store a batch (unless an equal one is already held) and return a list of its records"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                batch = tuple(items)
+                self._batches[batch_id] = batch
+                for record in batch:
+                    self._record_ids[id(record)] = self._record_ids.get(id(record), 0) + 1
+                while len(self._batches) > self.max_batches:
+                    _, evicted = self._batches.popitem(last=False)
+                    self._release(evicted)
+            self._batches.move_to_end(batch_id)
+            return list(batch)
+
+    def _release(self, batch):
+        for record in batch:
+            remaining = self._record_ids[id(record)] - 1
+            if remaining:
+                self._record_ids[id(record)] = remaining
+            else:
+                del self._record_ids[id(record)]
+
+    def is_shared(self, record):
+        with self._lock:
+            return id(record) in self._record_ids
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": len(self._batches),
+                "records": len(self._record_ids),
+                "bytes": sum(record_bytes(record) for batch in self._batches.values() for record in batch),
+            }
+
+
+class SessionRegistry:
+    """Tracks each session's batches so idle ones can be evicted and measured.
+
+    Eviction empties the session's lists in place, which drops its references to
+    the records even though Streamlit still holds the (now empty) lists.
+    """
+
+    def __init__(self, idle_seconds):
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sessions = {}  # session id -> (last active, {game: items})
+        self._evicted = OrderedDict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def touch(self, session_id):
+        """Mark a session active; returns True if its batches were evicted while idle"""
+        now = time.time()
+        with self._lock:
+            _, batches = self._sessions.get(session_id, (now, {}))
+            self._sessions[session_id] = (now, batches)
+            was_evicted = self._evicted.pop(session_id, None) is not None
+        self.evict_idle(now)
+        return was_evicted
+
+    def track(self, session_id, game, items):
+        """Register the list a session is currently playing for a game"""
+        with self._lock:
+            _, batches = self._sessions.get(session_id, (None, {}))
+            batches[game] = items
+            self._sessions[session_id] = (time.time(), batches)
+
+    def evict_idle(self, now=None):
+        """Empty the batches of sessions idle longer than idle_seconds"""
+        now = now or time.time()
+        with self._lock:
+            idle = [session_id for session_id, (last_active, _) in self._sessions.items()
+                    if now - last_active > self.idle_seconds]
+            for session_id in idle:
+                _, batches = self._sessions.pop(session_id)
+                for items in batches.values():
+                    items.clear()
+                self._evicted[session_id] = now
+                if len(self._evicted) > EVICTION_NOTICES:
+                    self._evicted.popitem(last=False)
+        return len(idle)
+
+    def session_bytes(self, session_id):
+        """Return (own bytes, shared bytes) for one session's batches"""
+        with self._lock:
+            _, batches = self._sessions.get(session_id, (None, {}))
+            batches = [list(items) for items in batches.values()]
+        own = shared = 0
+        for items in batches:
+            own += sys.getsizeof(items)
+            for record in items:
+                if shared_batches.is_shared(record):
+                    shared += record_bytes(record)
+                else:
+                    own += record_bytes(record)
+        return own, shared
+
+    def memory_report(self):
+        """One row per session: items held, bytes of its own, bytes shared with others"""
+        now = time.time()
+        with self._lock:
+            sessions = {session_id: (last_active, sum(len(items) for items in batches.values()))
+                        for session_id, (last_active, batches) in self._sessions.items()}
+        rows = []
+        for session_id, (last_active, item_count) in sessions.items():
+            own, shared = self.session_bytes(session_id)
+            rows.append({
+                "session": session_id[:8],
+                "items": item_count,
+                "own_bytes": own,
+                "shared_bytes": shared,
+                "idle_seconds": round(now - last_active),
+            })
+        return rows
+
+
+shared_batches = SharedBatches(config.SHARED_BATCHES_MAX)
+session_registry = SessionRegistry(config.SESSION_IDLE_SECONDS)
@@ -0,0 +1,171 @@
+"""
+Incremental parsing of streamed ChatGPT responses.
+Objects inside the returned JSON array are handed out as soon as their closing
+brace arrives, so the first item is usable long before the completion ends.
+"""
+
+import json
+import threading
+
+
+class JsonArrayStream:
+    """Incrementally parse the objects of a JSON array from text chunks"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, chunk):
+        """Add a chunk of text and return the objects it completed"""
+        self._buffer += chunk
+        items = []
+
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            if not self._started:
+                # Skip any prose before the array starts
+                if char == '[':
+                    self._started = True
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        items.append(json.loads(self._buffer[self._object_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass  # Skip a malformed item, keep the rest of the batch
+                    self._object_start = None
+            self._pos += 1
+
+        # Drop text that has been fully consumed
+        keep_from = self._object_start if self._object_start is not None else self._pos
+        self._buffer = self._buffer[keep_from:]
+        self._pos -= keep_from
+        if self._object_start is not None:
+            self._object_start = 0
+
+        return items
+
+
+class StreamedItems(list):
+    """A list that keeps filling in the background while a response streams in"""
+
+    def __init__(self):
+        super().__init__()
+        self.finished = threading.Event()
+        self.parsed = []  # Every value parsed so far, including ones not accepted
+        self.error = None  # Why the stream stopped early, if it failed
+        self._changed = threading.Condition()
+
+    @property
+    def parsed_count(self):
+        return len(self.parsed)
+
+    def _add_parsed(self, value):
+        with self._changed:
+            self.parsed.append(value)
+            self._changed.notify_all()
+
+    def _finish(self):
+        with self._changed:
+            self.finished.set()
+            self._changed.notify_all()
+
+    def follow(self, limit, accept=None, first_item_timeout=60):
+        """Mirror this stream into a new live list with its own `accept` filter.
+
+        Like stream_json_items, this blocks only until the mirror has its first
+        item (or the stream ends).
+        """
+        mirror = StreamedItems()
+        first_item = threading.Event()
+
+        def tail():
+            position = 0
+            try:
+                while len(mirror) < limit:
+                    with self._changed:
+                        while position == len(self.parsed) and not self.finished.is_set():
+                            self._changed.wait()
+                        new_values = self.parsed[position:]
+                        done = self.finished.is_set()
+                    position += len(new_values)
+                    for value in new_values:
+                        mirror._add_parsed(value)
+                        if len(mirror) < limit and (accept is None or accept(value)):
+                            mirror.append(value)
+                    if mirror:
+                        first_item.set()
+                    if done:
+                        break
+            finally:
+                mirror._finish()
+                first_item.set()
+
+        threading.Thread(target=tail, daemon=True).start()
+        first_item.wait(first_item_timeout)
+        return mirror
+
+
+def stream_json_items(deltas, limit, transform=None, on_complete=None, first_item_timeout=60):
+    """Parse streamed text deltas into a live list of items.
+
+    The deltas are consumed on a background thread. This call blocks only until
+    the first item is available (or the stream ends) and then returns the list,
+    which keeps growing up to `limit` items. `transform` maps each parsed object
+    to a list of values; `on_complete` receives every value parsed before the
+    list is marked finished, but only if the stream ended cleanly. If reading
+    the deltas fails, the exception is kept in the list's `error`.
+    """
+    items = StreamedItems()
+    first_item = threading.Event()
+
+    def consume():
+        parser = JsonArrayStream()
+        try:
+            for delta in deltas:
+                for obj in parser.feed(delta):
+                    values = transform(obj) if transform else [obj]
+                    for value in values:
+                        items._add_parsed(value)
+                        if len(items) < limit:
+                            items.append(value)
+                    if items:
+                        first_item.set()
+                if len(items) >= limit:
+                    break
+        except Exception as e:
+            items.error = e  # Keep whatever arrived before the stream failed
+        finally:
+            # Stopping early must still release the underlying connection
+            close = getattr(deltas, "close", None)
+            if close is not None:
+                close()
+        try:
+            # A stream cut off partway must not be cached as if it were the whole answer
+            if on_complete and items.parsed and items.error is None:
+                on_complete(list(items.parsed))
+        finally:
+            items._finish()
+            first_item.set()
+
+    threading.Thread(target=consume, daemon=True).start()
+    first_item.wait(first_item_timeout)
+    return items
@@ -0,0 +1,253 @@
+"""
+Hot-path instrumentation.
+Timers and counters for generation, LLM calls, parsing and tab rendering are
+kept in a process-wide registry and exported as Prometheus text, together with
+the stats the cache, connection pool and other components already keep. The
+text is served on a local endpoint (METRICS_PORT) and in the admin tab.
+"""
+
+import bisect
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "ysg_generate_seconds": "Time until a game has a playable batch (the first item, for streams)",
+    "ysg_batch_source_total": "Batches served, by where they came from",
+    "ysg_llm_request_seconds": "Duration of ChatGPT requests",
+    "ysg_llm_first_token_seconds": "Time to the first streamed token",
+    "ysg_llm_tokens_total": "Tokens reported in response.usage (estimated for streams)",
+    "ysg_parse_seconds": "Time spent extracting items from a response",
+    "ysg_parse_failures_total": "Responses no item could be extracted from",
+    "ysg_invalid_items_total": "Parsed items dropped by the game's schema check",
+    "ysg_prefetch_failures_total": "Background prefetches of the next batch that raised",
+    "ysg_tab_render_seconds": "Time to render one tab during a rerun",
+    "ysg_game_render_seconds": "Time to render a game's play area, in full reruns and fragment reruns",
+    "ysg_rerun_seconds": "Time of a whole script rerun",
+}
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters and histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block, recording it even when the block raises (e.g. st.rerun)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, labels=None):
+        """Decorator form of timer(); `labels` maps the call's arguments to labels"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **(labels(*args, **kwargs) if labels else {})):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def totals(self, name):
+        """Return (count, seconds) recorded for a histogram, summed over its labels"""
+        with self._lock:
+            histograms = [h for (key, _), h in self._histograms.items() if key == name]
+            return sum(h.count for h in histograms), sum(h.total for h in histograms)
+
+    def render(self):
+        """Prometheus text for everything recorded in this registry"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.total, h.count)) for key, h in self._histograms.items())
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_label_text(labels)} {value}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {count}")
+        return lines
+
+
+metrics = MetricsRegistry()
+
+
+def _gauge_lines(name, help_text, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_label_text(tuple(labels.items()))} {value}")
+    return lines
+
+
+def component_metrics():
+    """Gauges from the stats other components keep for themselves"""
+    # Imported here so any module can import metrics without an import cycle
+    from item_store import session_registry, shared_batches
+    from openai_pool import get_connection_stats
+    from resilience import get_resilience_stats
+    from response_cache import get_response_cache
+    from single_flight import in_flight
+    from token_budget import token_budget
+
+    lines = []
+    cache = get_response_cache().stats()
+    lines += _gauge_lines("ysg_response_cache", "Response cache counters and size",
+                          [({"stat": stat}, value) for stat, value in sorted(cache.items())])
+    connections = get_connection_stats()
+    lines += _gauge_lines("ysg_openai_connections", "HTTP connection pool reuse",
+                          [({"stat": stat}, value) for stat, value in sorted(connections.items())])
+    resilience = get_resilience_stats()
+    lines += _gauge_lines("ysg_call_outcomes", "ChatGPT call outcomes after retries and fallbacks",
+                          [({"outcome": outcome}, count) for outcome, count in sorted(resilience["outcomes"].items())])
+    lines += _gauge_lines("ysg_circuit_open", "1 while a model's circuit breaker is open",
+                          [({"model": model}, int(state == "open")) for model, state in sorted(resilience["circuits"].items())])
+    lines += _gauge_lines("ysg_single_flight", "Coalesced generation requests",
+                          [({"stat": stat}, value) for stat, value in sorted(in_flight.stats().items())])
+    shared = shared_batches.stats()
+    lines += _gauge_lines("ysg_shared_batches", "Batches shared by every session",
+                          [({"stat": stat}, value) for stat, value in sorted(shared.items())])
+    lines += _gauge_lines("ysg_sessions", "Sessions tracked for idle eviction", [({}, len(session_registry))])
+    budget = token_budget.snapshot()
+    lines += _gauge_lines("ysg_tokens_per_item", "Measured completion tokens per item",
+                          [({"game": game}, round(tokens, 2)) for game, tokens in sorted(budget["tokens_per_item"].items())])
+    lines += _gauge_lines("ysg_chunk_duplicate_rate", "Share of a split batch's items that repeated another chunk",
+                          [({"game": game}, round(rate, 3)) for game, rate in sorted(budget["chunk_duplicate_rate"].items())])
+    return lines
+
+
+def render_metrics():
+    """All metrics as Prometheus exposition text"""
+    return "\n".join(metrics.render() + component_metrics()) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        payload = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port):
+    """Serve /metrics on localhost once per process (Streamlit re-runs the app script).
+
+    If the port is taken, e.g. by another app process on the same host, the
+    app runs without the endpoint; this is reported once and returns None.
+    """
+    global _server, _server_failed
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:
+                _server_failed = True
+                print(f"⚠️ Metrics endpoint disabled: can't listen on port {port} ({e})")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
+        return _server
+
+
+_profiled = threading.Event()
+
+
+@contextmanager
+def profile_rerun():
+    """Profile the first rerun after start-up when PROFILE_RERUN is set.
+
+    The profile is written to PROFILE_DIR as a .prof file (open it with
+    snakeviz or pstats) and the top functions are printed to the console.
+    """
+    if not config.PROFILE_RERUN or _profiled.is_set():
+        yield
+        return
+    _profiled.set()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(config.PROFILE_DIR, f"rerun-{int(time.time())}.prof")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+        print(f"📈 Rerun profile written to {path}\n{summary.getvalue()}")
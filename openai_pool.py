@@ -0,0 +1,106 @@
+"""
+Process-wide OpenAI client with a shared HTTP connection pool.
+Every generator and every Streamlit session reuses the same keep-alive
+connections instead of opening a new TLS session per request. The SDK and
+httpx are only imported when the first client is built, so pages that never
+generate anything don't pay for them.
+"""
+
+import threading
+import time
+
+import config
+
+
+class ConnectionStats:
+    """Counts requests and new connections so pool reuse can be reported"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+            }
+
+
+class RateLimiter:
+    """Token bucket shared by every request sent to the provider"""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+connection_stats = ConnectionStats()
+rate_limiter = RateLimiter(config.OPENAI_REQUESTS_PER_MINUTE, config.OPENAI_RATE_BURST)
+
+
+def _build_http_client():
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.OPENAI_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=config.OPENAI_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            config.OPENAI_READ_TIMEOUT,
+            connect=config.OPENAI_CONNECT_TIMEOUT
+        ),
+        event_hooks={"request": [connection_stats.on_request]}
+    )
+
+
+def get_openai_client(api_key):
+    """Return the shared OpenAI client for an API key"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from openai import OpenAI
+
+            # Retries are handled by the resilience layer, not inside the SDK
+            client = OpenAI(api_key=api_key, http_client=_build_http_client(), max_retries=0)
+            _clients[api_key] = client
+        return client
+
+
+def get_connection_stats():
+    """Return request and connection reuse counters for the shared pool"""
+    return connection_stats.snapshot()
@@ -0,0 +1,30 @@
+"""
+Background prefetching of the next batch of game items.
+Batches are fetched on a shared thread pool and appended to the list the
+session is already playing, so the Next buttons never wait on ChatGPT.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=config.PREFETCH_WORKERS,
+    thread_name_prefix="prefetch"
+)
+
+
+def start_prefetch(items, fetch):
+    """Fetch the next batch in the background and append it to `items`.
+
+    `fetch` returns the new batch; it is expected to skip items the session
+    has already been dealt. The returned future resolves to the number of
+    items added.
+    """
+    def run():
+        batch = fetch()
+        items.extend(batch)
+        return len(batch)
+
+    return _executor.submit(run)
@@ -0,0 +1,109 @@
+"""
+Fuzzy prompt matching for cached batches.
+Prompts are reduced to their meaningful tokens and compared by character
+trigram overlap, so "Disney Songs!", "disney songs" and "songs from disney
+movies" all reuse the same stored batch. Everything runs locally.
+"""
+
+import re
+import threading
+import time
+
+import config
+from response_cache import get_response_cache
+
+
+# Words that don't change what a theme is about (the game already implies them)
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "from", "in", "on", "for", "by", "with",
+    "about", "to", "related", "some", "me", "give", "famous", "best", "top",
+    "song", "music", "track", "video", "movie", "film", "quote", "scene", "show",
+}
+REFRESH_SECONDS = 30
+
+
+def normalize_prompt(prompt):
+    """Reduce a prompt to a sorted set of meaningful, singular tokens"""
+    tokens = set()
+    for token in re.findall(r"[a-z0-9]+", prompt.lower().replace("'", "")):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        if token not in STOPWORDS:
+            tokens.add(token)
+    return " ".join(sorted(tokens))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PromptIndex:
+    """Similarity index over the prompts that already have a cached batch"""
+
+    def __init__(self, cache, threshold):
+        self.cache = cache
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries = {}  # game -> {normalized: (key, trigrams)}
+        self._loaded_at = {}
+
+    def _game_entries(self, game):
+        # Reload now and then to pick up prompts stored by other processes
+        if time.time() - self._loaded_at.get(game, 0) > REFRESH_SECONDS:
+            self._entries[game] = {
+                normalized: (key, trigrams(normalized))
+                for normalized, key in self.cache.prompts(game)
+            }
+            self._loaded_at[game] = time.time()
+        return self._entries[game]
+
+    def add(self, game, prompt, key):
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return
+        self.cache.remember_prompt(game, normalized, key)
+        with self._lock:
+            self._game_entries(game)[normalized] = (key, trigrams(normalized))
+
+    def lookup(self, game, prompt):
+        """Return the cache key of the most similar stored prompt, or None"""
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return None
+        query = trigrams(normalized)
+        best_key, best_score = None, 0.0
+        with self._lock:
+            for key, grams in self._game_entries(game).values():
+                score = similarity(query, grams)
+                if score > best_score:
+                    best_key, best_score = key, score
+        return best_key if best_score >= self.threshold else None
+
+    def find_batch(self, game, prompt):
+        """Return a stored batch for a similar prompt and count the outcome"""
+        key = self.lookup(game, prompt)
+        # The exact-key lookup already counted its miss; only the similar outcome is counted here
+        items = self.cache.get(key, counted=False) if key else None
+        self.cache.count("similar_hits" if items is not None else "similar_misses")
+        return items
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_prompt_index():
+    """Return the process-wide prompt index"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PromptIndex(get_response_cache(), config.PROMPT_SIMILARITY_THRESHOLD)
+        return _index
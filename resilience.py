@@ -0,0 +1,209 @@
+"""
+Resilience layer around ChatGPT calls.
+Transient failures (429s, timeouts, 5xx) are retried with jittered exponential
+backoff that honors Retry-After, within a deadline per call. A circuit breaker
+per model fails fast while the provider is degraded, and a fallback model is
+tried before giving up. Every outcome is counted.
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+import config
+
+
+RETRYABLE_STATUS = {408, 409, 429}
+PRIMARY_DEADLINE_SHARE = 2 / 3  # Part of the deadline the primary model may use when a fallback exists
+
+
+class ProviderUnavailable(Exception):
+    """Raised when no model could answer within the retry budget"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Return True if a call may be made now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True  # Half-open: one call decides whether to close
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class Outcomes:
+    """Thread-safe counters for what happened to each call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def count(self, name):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+outcomes = Outcomes()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model):
+    """Return the circuit breaker for a model"""
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS)
+            _breakers[model] = breaker
+        return breaker
+
+
+def is_retryable(error):
+    """Timeouts, dropped connections, rate limits and server errors are worth retrying"""
+    # The SDK is loaded by the time a call has failed; importing it here keeps app start-up light
+    import httpx
+    import openai
+
+    if isinstance(error, (TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, httpx.TransportError):
+        return True  # A stream cut off mid-response is raised by httpx, not wrapped by the SDK
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error):
+    """Read Retry-After (or retry-after-ms) from a provider error, if it sent one"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+            return max(0.0, retry_at - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the provider asked for"""
+    ceiling = min(config.OPENAI_RETRY_MAX_DELAY, config.OPENAI_RETRY_BASE_DELAY * 2 ** attempt)
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _call_model(call, model, deadline):
+    """Retry one model until it answers, fails for good or runs out of time"""
+    for attempt in range(config.OPENAI_MAX_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"No time left to call {model}")
+        try:
+            result = call(model, min(remaining, config.OPENAI_READ_TIMEOUT))
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, retry_after_seconds(e))
+            if attempt == config.OPENAI_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            outcomes.count("retries")
+            time.sleep(delay)
+            continue
+        return result, attempt
+
+
+def resilient_call(call, model):
+    """Run `call(model, timeout)` with retries, the circuit breaker and the fallback model.
+
+    Returns the call's result and the model that answered. Errors that retrying
+    cannot fix (bad request, auth) are raised as they are; ProviderUnavailable
+    is raised when every model failed or was circuit-broken.
+    """
+    models = [model]
+    if config.FALLBACK_MODEL and config.FALLBACK_MODEL != model:
+        models.append(config.FALLBACK_MODEL)
+
+    deadline = time.monotonic() + config.OPENAI_REQUEST_DEADLINE
+    last_error = None
+    for position, candidate in enumerate(models):
+        breaker = get_breaker(candidate)
+        if not breaker.allow():
+            outcomes.count("circuit_open")
+            continue
+        model_deadline = deadline
+        if position < len(models) - 1:
+            # Leave the fallback model time to answer
+            model_deadline = time.monotonic() + (deadline - time.monotonic()) * PRIMARY_DEADLINE_SHARE
+        try:
+            result, attempts = _call_model(call, candidate, model_deadline)
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()  # The provider answered; the request was at fault
+                outcomes.count("failed")
+                raise
+            breaker.record_failure()
+            last_error = e
+            continue
+        breaker.record_success()
+        outcomes.count("fallback_model" if position else ("retried_success" if attempts else "success"))
+        return result, candidate
+
+    outcomes.count("unavailable")
+    raise ProviderUnavailable("ChatGPT is unavailable right now") from last_error
+
+
+def get_resilience_stats():
+    """Return outcome counters and the state of each model's circuit breaker"""
+    with _breakers_lock:
+        breakers = {model: breaker.state for model, breaker in _breakers.items()}
+    return {"outcomes": outcomes.snapshot(), "circuits": breakers}
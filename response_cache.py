@@ -0,0 +1,232 @@
+"""
+Persistent response cache for the ChatGPT generators.
+Generated batches are stored in a SQLite file so every Streamlit session and
+every process pointing at the same file can reuse them. The same file keeps
+the answers of YouTube searches made for songs without a usable link.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import config
+
+
+class ResponseCache:
+    """SQLite-backed cache with a TTL and least-recently-used eviction"""
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                game TEXT NOT NULL,
+                items TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS prompts (
+                game TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (game, normalized)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS video_searches (
+                query TEXT PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(game, prompt, model, exclude=None):
+        """Build a cache key from game type, normalized prompt, model and exclude list"""
+        normalized_prompt = " ".join(prompt.lower().split())
+        normalized_exclude = sorted(" ".join(item.lower().split()) for item in (exclude or []))
+        payload = json.dumps([game, normalized_prompt, model, normalized_exclude])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, counted=True):
+        """Return the cached items for a key, or None on a miss.
+
+        With `counted` off the lookup leaves the hits/misses counters alone,
+        for callers that count their own outcome.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT items, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    if counted:
+                        self._increment("misses")
+                    self._conn.commit()
+                    return None
+
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+                )
+                if counted:
+                    self._increment("hits")
+                self._conn.commit()
+                return json.loads(row[0])
+        except sqlite3.Error:
+            # A broken cache must never break generation
+            return None
+
+    def put(self, key, game, items):
+        """Store a generated batch and evict the least recently used entries"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, game, items, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, game, json.dumps(items), now, now)
+                )
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._conn.execute(
+                    "DELETE FROM prompts WHERE key NOT IN (SELECT key FROM responses)"
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def recent(self, game, limit=10):
+        """Return the most recently used batches of a game, newest first"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT items FROM responses WHERE game = ? ORDER BY last_access DESC LIMIT ?",
+                    (game, limit)
+                ).fetchall()
+            return [json.loads(row[0]) for row in rows]
+        except sqlite3.Error:
+            return []
+
+    def remember_prompt(self, game, normalized, key):
+        """Record which cached batch a normalized prompt was answered with"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO prompts (game, normalized, key) VALUES (?, ?, ?)",
+                    (game, normalized, key)
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def prompts(self, game):
+        """Return (normalized prompt, key) pairs recorded for a game"""
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT normalized, key FROM prompts WHERE game = ?", (game,)
+                ).fetchall()
+        except sqlite3.Error:
+            return []
+
+    def search_result(self, query, ttl_seconds):
+        """Return the video ID cached for a search ('' if it found nothing), or None on a miss"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT video_id, created_at FROM video_searches WHERE query = ?", (query,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or time.time() - row[1] > ttl_seconds:
+            return None
+        return row[0]
+
+    def remember_search(self, query, video_id):
+        """Cache what a search found; an empty video ID records that it found nothing"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO video_searches (query, video_id, created_at) VALUES (?, ?, ?)",
+                    (query, video_id, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def count(self, name):
+        """Increment a named counter"""
+        try:
+            with self._lock:
+                self._increment(name)
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries"""
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        total = hits + misses
+        similar_hits = counters.get("similar_hits", 0)
+        similar_total = similar_hits + counters.get("similar_misses", 0)
+        return {
+            **counters,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "similar_hit_rate": similar_hits / similar_total if similar_total else 0.0,
+            "entries": entries,
+        }
+
+    def _increment(self, name):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                config.CACHE_DB_PATH,
+                config.CACHE_TTL_SECONDS,
+                config.CACHE_MAX_ENTRIES
+            )
+        return _cache
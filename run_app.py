@@ -2,36 +2,91 @@
 """
 YouTube Video Game - Launcher Script
 This script checks dependencies and launches the Streamlit app.
+
+Dependencies are checked from installed package metadata, without importing
+them, and the result is cached against a fingerprint of the environment so
+later launches skip the check until something is installed or removed.
 """
 
+import time
+
+LAUNCH_STARTED = time.perf_counter()
+
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
 import subprocess
 import sys
-import os
+import urllib.request
+
+# Distribution name -> top-level module it installs
+REQUIRED_PACKAGES = {
+    'streamlit': 'streamlit',
+    'openai': 'openai',
+    'youtube-search-python': 'youtubesearchpython',
+    'python-dotenv': 'dotenv',
+    'requests': 'requests',
+}
+
+PREFLIGHT_CACHE = ".preflight.json"
+SERVER_PORT = int(os.environ.get("STREAMLIT_SERVER_PORT", "8501"))
+SERVER_READY_TIMEOUT = 60
+
+def environment_fingerprint():
+    """Hash of the interpreter, the requirements and the import path directories.
+
+    Installing or removing a package adds or deletes entries in site-packages,
+    which changes that directory's modification time. The script's own
+    directory (sys.path[0]) is skipped, since the cache file is written there.
+    """
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode())
+    digest.update(sys.version.encode())
+    digest.update(json.dumps(REQUIRED_PACKAGES, sort_keys=True).encode())
+    for path in sys.path[1:]:
+        try:
+            digest.update(f"{path}:{os.stat(path).st_mtime_ns}".encode())
+        except OSError:
+            continue
+    return digest.hexdigest()
+
+def load_preflight_cache():
+    try:
+        with open(PREFLIGHT_CACHE, encoding="utf-8") as f:
+            return json.load(f).get("fingerprint")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def save_preflight_cache(fingerprint):
+    try:
+        with open(PREFLIGHT_CACHE, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "checked_at": time.time()}, f)
+    except OSError:
+        pass  # The check simply runs again next time
+
+def is_installed(package, module):
+    """Check metadata first; fall back to locating the module for installs without metadata"""
+    try:
+        importlib.metadata.distribution(package)
+        return True
+    except importlib.metadata.PackageNotFoundError:
+        return importlib.util.find_spec(module) is not None
 
 def check_dependencies():
     """Check if required packages are installed"""
-    required_packages = [
-        'streamlit',
-        'openai',
-        'youtube-search-python',
-        'python-dotenv',
-        'requests'
+    missing_packages = [
+        package for package, module in REQUIRED_PACKAGES.items()
+        if not is_installed(package, module)
     ]
-    
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
-    
+
     if missing_packages:
         print("❌ Missing required packages:")
         for package in missing_packages:
             print(f"   - {package}")
         print("\n📦 Installing missing packages...")
-        
+
         try:
             subprocess.check_call([sys.executable, "-m", "pip", "install"] + missing_packages)
             print("✅ All packages installed successfully!")
@@ -39,36 +94,71 @@ def check_dependencies():
             print("❌ Failed to install packages. Please run:")
             print("   pip install -r requirements.txt")
             return False
-    
+
+    return True
+
+def preflight(recheck=False):
+    """Run check_dependencies() unless this environment already passed it"""
+    started = time.perf_counter()
+    if not recheck and load_preflight_cache() == environment_fingerprint():
+        print(f"✅ Dependencies unchanged since the last launch ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return True
+    if not check_dependencies():
+        return False
+    # Fingerprint after any install, which changes site-packages
+    save_preflight_cache(environment_fingerprint())
+    print(f"✅ Dependencies checked ({(time.perf_counter() - started) * 1000:.0f} ms)")
     return True
 
+def wait_for_server(process):
+    """Poll Streamlit's health endpoint; returns seconds since launch, or None"""
+    url = f"http://localhost:{SERVER_PORT}/_stcore/health"
+    deadline = time.perf_counter() + SERVER_READY_TIMEOUT
+    while time.perf_counter() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - LAUNCH_STARTED
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return None
+
 def main():
     """Main launcher function"""
     print("🎵 YouTube Video Game Launcher")
     print("=" * 40)
-    
+
     # Check if app.py exists
     if not os.path.exists("app.py"):
         print("❌ app.py not found in current directory!")
         print("Please run this script from the project root directory.")
         return
-    
-    # Check dependencies
-    if not check_dependencies():
+
+    # Check dependencies (--recheck ignores the cached result)
+    if not preflight(recheck="--recheck" in sys.argv[1:]):
         return
-    
+
     print("\n🚀 Starting YouTube Video Game...")
-    print("📱 The app will open in your browser at http://localhost:8501")
+    print(f"📱 The app will open in your browser at http://localhost:{SERVER_PORT}")
     print("🔄 Press Ctrl+C to stop the app")
     print("=" * 40)
-    
+
+    process = None
     try:
         # Run the Streamlit app
-        subprocess.run([sys.executable, "-m", "streamlit", "run", "app.py"])
+        process = subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py"])
+        ready_after = wait_for_server(process)
+        if ready_after is not None:
+            print(f"⏱️ Server ready {ready_after:.1f}s after launch")
+        process.wait()
     except KeyboardInterrupt:
+        if process is not None:
+            process.terminate()
+            process.wait()
         print("\n👋 Thanks for playing! Goodbye!")
     except Exception as e:
         print(f"❌ Error running the app: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
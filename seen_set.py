@@ -0,0 +1,71 @@
+"""
+Per-session record of the items a player has already been dealt.
+Only short hashes of each item's identity are kept, plus a bounded list of
+recent exclusions to mention in prompts, so memory and prompt size stay flat
+no matter how long someone plays.
+"""
+
+import base64
+import hashlib
+import threading
+from collections import deque
+
+import config
+
+
+def _digest(identity):
+    normalized = " ".join(identity.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class SeenSet:
+    """Hashed identities of the items already dealt to one session for one game"""
+
+    def __init__(self, spec, max_exclusions=None):
+        self.spec = spec
+        # Stream and prefetch threads add items while the session reads or saves the set
+        self._lock = threading.Lock()
+        self._hashes = set()
+        self._recent = deque(maxlen=max_exclusions or config.MAX_PROMPT_EXCLUSIONS)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, item):
+        return _digest(self.spec.identity(item)) in self._hashes
+
+    def add(self, item):
+        """Record an item and return True if it had not been seen before"""
+        digest = _digest(self.spec.identity(item))
+        try:
+            excluded = self.spec.format_exclude(item)
+        except (KeyError, TypeError, AttributeError):
+            excluded = None
+        with self._lock:
+            if digest in self._hashes:
+                return False
+            self._hashes.add(digest)
+            if excluded is not None:
+                self._recent.append(excluded)
+        return True
+
+    def exclusions(self):
+        """Return the most recent items formatted for the prompt's avoid list"""
+        with self._lock:
+            return list(self._recent)
+
+    def to_state(self):
+        """Compact, JSON-ready form for the game state store (8 bytes per hash)"""
+        with self._lock:
+            packed = b"".join(digest.to_bytes(8, "little") for digest in self._hashes)
+            recent = list(self._recent)
+        return {"hashes": base64.b64encode(packed).decode("ascii"), "recent": recent}
+
+    def restore(self, state):
+        """Replace the contents with what to_state() saved"""
+        packed = base64.b64decode(state.get("hashes", ""))
+        hashes = {int.from_bytes(packed[i:i + 8], "little") for i in range(0, len(packed), 8)}
+        with self._lock:
+            self._hashes = hashes
+            self._recent.clear()
+            self._recent.extend(state.get("recent", []))
@@ -0,0 +1,77 @@
+"""
+Request coalescing across sessions.
+When several players ask for the same batch at the same time, only the first
+call reaches ChatGPT; the others wait on its future and share the result.
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+def _still_streaming(result):
+    finished = getattr(result, "finished", None)
+    return finished is not None and not finished.is_set()
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and hands its result to every caller.
+
+    A result that is still streaming (it has a `finished` event that is not set
+    yet) keeps its flight open, so players arriving mid-stream share it too.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def run(self, key, fn):
+        """Return (result, led): led is True for the caller that actually ran `fn`"""
+        with self._lock:
+            self._sweep()
+            future = self._flights.get(key)
+            led = future is None
+            if led:
+                future = Future()
+                self._flights[key] = future
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not led:
+            return future.result(), False
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            self._land(key, future)
+            raise
+        future.set_result(result)
+        if not _still_streaming(result):
+            self._land(key, future)
+        return result, True
+
+    def _land(self, key, future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def _sweep(self):
+        # Drop flights whose streams have finished since they were started
+        landed = [key for key, future in self._flights.items()
+                  if future.done() and (future.exception() is not None or not _still_streaming(future.result()))]
+        for key in landed:
+            del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "followers": self.followers,
+            }
+
+
+in_flight = SingleFlight()
@@ -0,0 +1,148 @@
+"""
+Durable game state, keyed by a resumable game token.
+A session's batches, positions, hint level and seen sets are written as
+compressed compact JSON to a pluggable backend after every change, so a
+player who reloads, lands on another replica or comes back after a worker
+restart resumes their game (?game=<token>) without regenerating it. The
+default backend keeps states in this process's memory; STATE_BACKEND=sqlite
+stores them in a SQLite file every process can share.
+"""
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import config
+
+
+STATE_VERSION = 1
+
+
+def new_game_token():
+    """A short, unguessable token for the URL"""
+    return secrets.token_urlsafe(12)
+
+
+def encode_state(state):
+    """Compress a JSON-ready state; records (tuples) are stored as plain lists"""
+    payload = json.dumps({"v": STATE_VERSION, **state}, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"))
+
+
+def decode_state(blob):
+    """Return the state saved by encode_state, or None if it is unreadable or outdated"""
+    try:
+        state = json.loads(zlib.decompress(blob).decode("utf-8"))
+    except (zlib.error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.pop("v", None) != STATE_VERSION:
+        return None
+    return state
+
+
+class MemoryStateBackend:
+    """Game states held by this process only; lost when it restarts"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    def get(self, token):
+        with self._lock:
+            blob = self._states.get(token)
+            if blob is not None:
+                self._states.move_to_end(token)
+            return blob
+
+    def put(self, token, blob):
+        with self._lock:
+            self._states[token] = blob
+            self._states.move_to_end(token)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+
+
+class SqliteStateBackend:
+    """Game states in a SQLite file shared by every process that points at it"""
+
+    def __init__(self, path, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS game_states (
+                token TEXT PRIMARY KEY,
+                state BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS game_states_updated_at ON game_states (updated_at)"
+        )
+        self._conn.commit()
+
+    def get(self, token):
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT state, updated_at FROM game_states WHERE token = ?", (token,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def put(self, token, blob):
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO game_states (token, state, updated_at) VALUES (?, ?, ?)",
+                    (token, blob, now)
+                )
+                self._conn.execute(
+                    "DELETE FROM game_states WHERE updated_at < ?", (now - self.ttl_seconds,)
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            pass  # A broken store must never break the game
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """Return the process-wide state backend chosen by STATE_BACKEND"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if config.STATE_BACKEND == "sqlite":
+                _backend = SqliteStateBackend(config.STATE_DB_PATH, config.STATE_TTL_SECONDS)
+            else:
+                _backend = MemoryStateBackend(config.STATE_MEMORY_MAX_GAMES)
+        return _backend
+
+
+def set_state_backend(backend):
+    """Replace the state backend, e.g. with another key-value store; it needs get and put"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def save_game(token, state):
+    get_state_backend().put(token, encode_state(state))
+
+
+def load_game(token):
+    """Return the state saved for a token, or None"""
+    blob = get_state_backend().get(token) if token else None
+    return decode_state(blob) if blob is not None else None
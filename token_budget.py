@@ -0,0 +1,169 @@
+"""
+Token-budgeted request sizing.
+Tokens per item, time to first token and decode speed are measured from real
+responses, and each request's max_tokens and chunking are planned from those
+averages and the limits in config.py.
+"""
+
+import math
+import threading
+from typing import NamedTuple
+
+import config
+
+
+CHARS_PER_TOKEN = 4  # Rough size of a token when a response reports no usage
+JSON_OVERHEAD_TOKENS = 20  # Brackets and the JSON-mode wrapper object
+SMOOTHING = 0.2  # Weight of each new measurement in the running averages
+DEFAULT_FIRST_TOKEN_SECONDS = 1.0
+DEFAULT_TOKENS_PER_SECOND = 50.0
+
+
+class BudgetPlan(NamedTuple):
+    """How to ask for a number of items: one request per chunk size"""
+    chunks: tuple
+    max_tokens: int
+
+
+def _average(current, sample):
+    return sample if current is None else current + SMOOTHING * (sample - current)
+
+
+class LatencyFit:
+    """Decayed least-squares fit of request time = first token + tokens * per-token time.
+
+    Every response adds a (tokens, seconds) point; a streamed one also adds
+    (0, time to first token). Until the points spread enough to fit a line, the
+    default time to first token is assumed.
+    """
+
+    def __init__(self):
+        self._n = self._x = self._y = self._xx = self._xy = 0.0
+
+    def add(self, tokens, seconds):
+        keep = 1 - SMOOTHING / 2
+        self._n = self._n * keep + 1
+        self._x = self._x * keep + tokens
+        self._y = self._y * keep + seconds
+        self._xx = self._xx * keep + tokens * tokens
+        self._xy = self._xy * keep + tokens * seconds
+
+    def coefficients(self):
+        """Return (first token seconds, seconds per token)"""
+        default = (DEFAULT_FIRST_TOKEN_SECONDS, 1 / DEFAULT_TOKENS_PER_SECOND)
+        if not self._n:
+            return default
+        mean_x, mean_y = self._x / self._n, self._y / self._n
+        variance = self._xx / self._n - mean_x * mean_x
+        if variance > 1.0:
+            slope = (self._xy / self._n - mean_x * mean_y) / variance
+            intercept = mean_y - slope * mean_x
+            if slope > 0 and intercept >= 0:
+                return intercept, slope
+        if mean_x <= 0:
+            return default
+        intercept = min(DEFAULT_FIRST_TOKEN_SECONDS, mean_y / 2)
+        return intercept, (mean_y - intercept) / mean_x
+
+
+class TokenBudget:
+    """Running per-game token averages and per-model latency measurements"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens_per_item = {}
+        self._latency = {}
+        self._duplicate_rate = {}
+
+    def tokens_per_item(self, game):
+        with self._lock:
+            return self._tokens_per_item.get(game) or config.TOKENS_PER_ITEM_ESTIMATE
+
+    def record(self, game, model, completion_tokens, items, elapsed, first_token_seconds=None):
+        """Fold one response into the averages (streamed ones pass their time to first token)"""
+        with self._lock:
+            if items:
+                self._tokens_per_item[game] = _average(
+                    self._tokens_per_item.get(game), completion_tokens / items)
+            latency = self._latency.setdefault(model, LatencyFit())
+            latency.add(completion_tokens, elapsed)
+            if first_token_seconds is not None:
+                latency.add(0, first_token_seconds)
+
+    def record_chunks(self, game, returned, unique):
+        """Fold in how many items of a split batch repeated another chunk's"""
+        if returned:
+            with self._lock:
+                self._duplicate_rate[game] = _average(self._duplicate_rate.get(game), 1 - unique / returned)
+
+    def duplicate_rate(self, game):
+        with self._lock:
+            rate = self._duplicate_rate.get(game)
+        return config.CHUNK_DUPLICATE_RATE_ESTIMATE if rate is None else rate
+
+    def estimate_seconds(self, game, model, count):
+        """Expected wall-clock time of one request for `count` items"""
+        tokens = count * self.tokens_per_item(game) + JSON_OVERHEAD_TOKENS
+        with self._lock:
+            first_token, per_token = self._latency.get(model, LatencyFit()).coefficients()
+        return first_token + tokens * per_token
+
+    def max_tokens(self, game, count):
+        """max_tokens for a request of `count` items, capped at MAX_TOKENS"""
+        expected = count * self.tokens_per_item(game) * config.TOKEN_HEADROOM
+        return min(config.MAX_TOKENS, math.ceil(expected) + JSON_OVERHEAD_TOKENS)
+
+    def split_seconds(self, game, model, count, parts):
+        """Expected time of `count` items as `parts` parallel chunks.
+
+        Chunks share one prompt, so some of their items repeat each other's;
+        those are requested again afterwards in a serial top-up.
+        """
+        seconds = self.estimate_seconds(game, model, math.ceil(count / parts))
+        if parts > 1:
+            repeated = math.ceil(count * self.duplicate_rate(game))
+            if repeated:
+                seconds += self.estimate_seconds(game, model, repeated)
+        return seconds
+
+    def plan(self, game, model, count, allow_split=True):
+        """Plan the requests for `count` items.
+
+        A batch that cannot fit in MAX_TOKENS is always split. Otherwise it is
+        only split once the model's latency has been measured, and then only
+        while each extra chunk saves at least CHUNK_MIN_SAVING_SECONDS of
+        wall-clock time after the top-up for items the chunks repeat.
+        """
+        per_item = self.tokens_per_item(game) * config.TOKEN_HEADROOM
+        fits = max(1, int((config.MAX_TOKENS - JSON_OVERHEAD_TOKENS) // per_item))
+        parts = math.ceil(count / fits)
+
+        with self._lock:
+            measured = model in self._latency
+        if allow_split and measured:
+            while parts < min(config.CHUNK_MAX_PARALLEL, count):
+                current = self.split_seconds(game, model, count, parts)
+                split = self.split_seconds(game, model, count, parts + 1)
+                if current - split < config.CHUNK_MIN_SAVING_SECONDS:
+                    break
+                parts += 1
+        elif parts > 1:
+            # A streamed batch is a single request, so it is trimmed to what fits
+            count, parts = fits, 1
+
+        size, extra = divmod(count, parts)
+        chunks = tuple(size + (1 if n < extra else 0) for n in range(parts))
+        return BudgetPlan(chunks, self.max_tokens(game, chunks[0]))
+
+    def snapshot(self):
+        with self._lock:
+            latency = {model: fit.coefficients() for model, fit in self._latency.items()}
+            return {
+                "tokens_per_item": dict(self._tokens_per_item),
+                "chunk_duplicate_rate": dict(self._duplicate_rate),
+                "first_token_seconds": {model: first for model, (first, _) in latency.items()},
+                "tokens_per_second": {model: 1 / per_token for model, (_, per_token) in latency.items()},
+            }
+
+
+token_budget = TokenBudget()
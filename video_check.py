@@ -0,0 +1,93 @@
+"""
+Availability checks for YouTube videos before they are dealt to players.
+Video IDs are checked in parallel against YouTube's oEmbed endpoint (or any
+checker plugged in with set_availability_checker) and the results are cached
+process-wide for VIDEO_CHECK_TTL_SECONDS.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import config
+
+
+_session = requests.Session()
+
+
+def oembed_checker(video_id):
+    """Ask the oEmbed endpoint whether a video exists and may be embedded.
+
+    Returns True or False, or None when the answer is unknown (network error).
+    """
+    try:
+        response = _session.get(
+            config.VIDEO_OEMBED_URL,
+            params={"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"},
+            timeout=config.VIDEO_CHECK_TIMEOUT
+        )
+    except requests.RequestException:
+        return None
+    if response.status_code == 200:
+        return True
+    if response.status_code in (400, 401, 403, 404):
+        return False
+    return None
+
+
+class AvailabilityCache:
+    """Thread-safe video ID -> availability map with a TTL"""
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._results = {}
+
+    def get(self, video_id):
+        with self._lock:
+            entry = self._results.get(video_id)
+            if entry is None:
+                return None
+            available, checked_at = entry
+            if time.time() - checked_at > self.ttl_seconds:
+                del self._results[video_id]
+                return None
+            return available
+
+    def put(self, video_id, available):
+        with self._lock:
+            self._results[video_id] = (available, time.time())
+
+
+availability_cache = AvailabilityCache(config.VIDEO_CHECK_TTL_SECONDS)
+_checker = oembed_checker
+_executor = ThreadPoolExecutor(
+    max_workers=config.VIDEO_CHECK_WORKERS,
+    thread_name_prefix="video-check"
+)
+
+
+def set_availability_checker(checker):
+    """Replace the availability checker, e.g. with a local stub in tests"""
+    global _checker
+    _checker = checker
+
+
+def filter_available(items, video_id=lambda item: item):
+    """Drop items whose video is unavailable, checking uncached IDs in parallel"""
+    if not config.VIDEO_CHECK_ENABLED or config.OFFLINE_MODE:
+        return list(items)
+
+    status = {video_id(item): None for item in items}
+    for checked_id in status:
+        status[checked_id] = availability_cache.get(checked_id)
+    unknown = [checked_id for checked_id, available in status.items() if available is None]
+    for checked_id, available in zip(unknown, _executor.map(_checker, unknown)):
+        status[checked_id] = available
+        if available is not None:
+            availability_cache.put(checked_id, available)
+
+    # Videos whose check failed are kept rather than dropped on a network blip
+    return [item for item in items if status[video_id(item)] is not False]
@@ -0,0 +1,34 @@
+"""
+YouTube link parsing helpers.
+"""
+
+import re
+
+
+# Every YouTube URL shape we accept, matched in a single pass. Video IDs are
+# always 11 characters, so longer runs are rejected instead of truncated.
+VIDEO_URL_PATTERN = re.compile(
+    r'(?:https?://)?(?:(?:www|m|music)\.)?'
+    r'(?:'
+    r'youtube\.com/(?:watch\?(?:[^\s#"\'<>]*?&)?v=|embed/|shorts/|live/|v/)'
+    r'|youtube-nocookie\.com/embed/'
+    r'|youtu\.be/'
+    r')'
+    r'([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])'
+)
+
+
+# Extract YouTube video IDs from text
+def extract_youtube_links(text):
+    """Extract YouTube video IDs from text, in order and without duplicates"""
+    return list(dict.fromkeys(VIDEO_URL_PATTERN.findall(text)))
+
+
+def extract_video_ids(links):
+    """Extract the first video ID of every link in a batch (None where there is none)"""
+    search = VIDEO_URL_PATTERN.search
+    video_ids = []
+    for link in links:
+        match = search(link) if link else None
+        video_ids.append(match.group(1) if match else None)
+    return video_ids
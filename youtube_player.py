@@ -0,0 +1,23 @@
+"""
+Click-to-load YouTube player for the song game.
+A Streamlit component (player_frontend/index.html) that shows the video's
+thumbnail and only loads YouTube's player once it is clicked. The component
+stays mounted across reruns, so Next/Previous swap the video ID inside one
+persistent player instead of rebuilding an autoplaying iframe, and the next
+song's thumbnail is fetched ahead of time.
+"""
+
+import os
+
+import streamlit.components.v1 as components
+
+
+_player = components.declare_component(
+    "youtube_player",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "player_frontend")
+)
+
+
+def youtube_player(video_id, next_video_id=None, height=400, key="youtube_player"):
+    """Render the player for `video_id`; a stable `key` keeps the same player across reruns"""
+    _player(video_id=video_id, next_video_id=next_video_id, height=height, key=key, default=None)
@@ -0,0 +1,75 @@
+"""
+YouTube search fallback for songs without a usable video.
+Songs whose link holds no video ID, or whose video is dead, are looked up
+with a "title artist karaoke" search. Searches run in parallel on a pool
+shared by every session (VIDEO_SEARCH_WORKERS) and each answer is kept in the
+response cache's SQLite file, so a query reaches YouTube once per TTL. The
+backend is youtube-search-python unless another is plugged in with
+set_search_backend.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from response_cache import get_response_cache
+
+
+VIDEO_ID = re.compile(r'[A-Za-z0-9_-]{11}')
+
+
+def youtubesearch_backend(query):
+    """Return the first video youtube-search-python finds for a query.
+
+    Returns '' when the search found nothing, or None when the answer is
+    unknown (library missing, network error), which is not cached.
+    """
+    try:
+        from youtubesearchpython import VideosSearch
+    except ImportError:
+        return None  # youtube-search-python is optional
+    try:
+        results = VideosSearch(query, limit=1).result().get("result") or []
+    except Exception:
+        return None
+    return (results[0].get("id") or "") if results else ""
+
+
+_backend = youtubesearch_backend
+_executor = ThreadPoolExecutor(
+    max_workers=config.VIDEO_SEARCH_WORKERS,
+    thread_name_prefix="video-search"
+)
+
+
+def set_search_backend(backend):
+    """Replace the search backend, e.g. with a local stub in tests"""
+    global _backend
+    _backend = backend
+
+
+def search_query(title, artist):
+    """The search sent for a song: its karaoke version, like the prompt asks ChatGPT for"""
+    return " ".join(f"{title} {artist} karaoke".lower().split())
+
+
+def search_video(query):
+    """Return the video ID a search finds, from the cache when it was asked before"""
+    cache = get_response_cache()
+    video_id = cache.search_result(query, config.VIDEO_SEARCH_TTL_SECONDS)
+    if video_id is None:
+        video_id = _backend(query)
+        if video_id is None:
+            return None
+        if not VIDEO_ID.fullmatch(video_id):
+            video_id = ""
+        cache.remember_search(query, video_id)
+    return video_id or None
+
+
+def resolve_videos(queries):
+    """Search several queries in parallel; returns {query: video ID or None}"""
+    unique = list(dict.fromkeys(queries))
+    if not config.VIDEO_SEARCH_ENABLED or config.OFFLINE_MODE:
+        return dict.fromkeys(unique)
+    return dict(zip(unique, _executor.map(search_video, unique)))